@@ -1,83 +1,275 @@
 """
 This class is an AI agent using A* to find a solution path
 Characteristics:
-    -   Multi-threading to process different paths
-    -   Communicate the result with GameUI
+    -   Single-threaded heap queue search (the old multi-threaded search is kept for comparison)
+    -   Communicate the result with Game (the board size is passed in, nothing is read from the UI)
     -   Time the computational time
     -   Check will the snake collide right after reaching the goal
+        -   The body is simulated after the path, a plan is rejected if the head cannot reach the tail
+            (breadth first flood fill on bitboards, a body cell can be entered once it is vacated)
+        -   The work after the first rejection is bounded by the E expansions used to find the rejected plan,
+            the search for a safe plan goes on for E / 4 more expansions (and at most max_rejections plans)
+        -   Then the head chases its tail instead: a single move after which the tail can still be reached
+            (at most three flood fills, the farthest from the goal), Game asks again after the move
+        -   The first unsafe plan is used if no move keeps the tail in reach, rather than no plan at all
+        -   The tail is chased as well when there is no path to the goal at all
     -   Make emergency decision (Low priority)  --> Avoid colliding while computing
 
 Representation of Node:
-    -   Tuple:  (pos, direction)    --> Direction is used for outputting final result
+    -   (cell, move, parent)    --> The directions are rebuilt from the parents for outputting final result
+    -   A cell is encoded as y * borderSize + x, and a move as an index of Grid.MOVES
+    -   Tuples and Direction values are only converted in find_path
 
 Heuristic (Need to determine the weighting):
     -   Manhattan distance from p to goal (i.e., food)
+    -   Or the distance field from the goal around the body (heuristic='distance_field')
+        A body cell is a wall when it is still occupied as the head can first get there
     -   How many block is sticking to its body  (low-priority)
 
 Cost:
     -   Distance moved from beginning to p
 
 Heap Queue (Priority Queue):
+    -   Either a heap queue or a bucket queue (f(p) is a small integer, never above 2 * borderSize^2)
+    -   The bucket queue breaks ties by popping the latest node first instead of the rules below
     -   Lower f(p) first
     -   f(p) = Heuristic(p) + Cost(p)
     -   If tie:
         0.  Close to body   --> Prevent trapping itself
         1.  Up
         2.  Down
-        3.  Left
-        4   Right
+        3.  Right
+        4   Left
 
 Methods:
     Public:
         -   create()
         -   find_path(beginning_pos, goal_pos, snake)
         -   end_game() --> Stops all threads and reset
+        -   stats() --> See Agent
 
     Private:
-        -   manhattan_distance(node_pos, goal_pos)
-        -   isGoal(pos)
-        -   isCollide(pos) --> Prune
-        -   isCollide_old_body(pos)
-        -   isCollide_new_body(pos)
-        -   isClose_to_body(pos)
-        -   prune_direction(direction)
-        -   addFrontier(frontier, direction)    --> add valid paths into the frontier
+        -   update_body(snake_whole_body)
+        -   isCollide(cell) --> Prune
+        -   isCollide_old_body(cell)
+        -   isCollide_new_body(cell)
+        -   isClose_to_body(cell)
+        -   expand(node)    --> add valid paths into the frontier, using the cached successor table
+
+Anytime search:
+    -   f(p) = Cost(p) + weight * Heuristic(p), a weight above 1 finds a path sooner but it may be longer
+    -   The search stops at the deadline, then the path to the deepest expanded node is kept
+        as the best safe partial plan (see AnytimeAStar)
+    -   The clock is read from the first node (and by the safety flood fill), past the deadline the search stops
+        as soon as a safe move has been expanded
+
+Closed Set:
+    -   A state is (head pos, step index) where the step index is capped at the snake length,
+        once the path is as long as the snake, the whole old body has vacated
+    -   Each state is expanded at most once
+
+Occupancy of the old body:
+    -   A table of the step at which each cell is vacated, offset by base
+    -   A cell is occupied at depth d iff its step - base > d, so each check is a single lookup
+    -   The table (and the bitboard of the body) is kept between calls, when the snake has made one move
+        only the new head is written and the old tail is dropped by bumping base
+    -   The Manhattan table is kept for the same goal
+
+Occupancy of the new body:
+    -   Every node keeps the bitboard of the cells of its path (its parent's trail | its own bit)
+    -   While the path is shorter than the snake the whole path is the new body, so each check is a single bit
+    -   The trail is not kept past the snake length, a deeper node walks its last (length - 1) parents
 """
 import heapq
+import itertools
 import queue
 import threading
+import time
+from collections import deque
 
-import GameUI
+import Bitboard
+
+from AI_Agents import Grid
+from AI_Agents.Agent import Agent
+from AI_Agents.BucketQueue import BucketQueue
 from AI_Agents.Node import Node
 from Direction import Direction
 
+INFINITY = float('inf')
+
 
-class AStar:
-    def __init__(self):
+class AStar(Agent):
+    def __init__(self, borderSize, threaded=False, frontier='heap', heuristic='manhattan',
+                 safety_check=True, max_rejections=16):
         self.frontier = []  # This frontier will be a heap queue
         self.result = queue.Queue()
-        self.borderSize = GameUI.getNumOfGrids()
+        self.closed = set()
+        self.closed_lock = threading.Lock()
+        self.borderSize = borderSize
+
+        # The threaded search is only kept for comparison, the heap search runs inline
+        self.threaded = threaded
+        self.expansions = 0
+
+        # The frontier of the inline search, 'heap' or 'bucket'
+        if frontier not in ('heap', 'bucket'):
+            raise ValueError(f'Unknown frontier {frontier}')
+        self.frontier_type = frontier
+        self.buckets = BucketQueue(2 * borderSize * borderSize) if frontier == 'bucket' else None
+
+        # The heuristic, 'manhattan' or 'distance_field'
+        if heuristic not in ('manhattan', 'distance_field'):
+            raise ValueError(f'Unknown heuristic {heuristic}')
+        # DistanceField pulls in numpy, it is only imported when it is used
+        self.distance_field = None
+        if heuristic == 'distance_field':
+            from AI_Agents.DistanceField import DistanceField
+            self.distance_field = DistanceField(borderSize)
+
+        # The step at which each cell is vacated by the current body (offset by base), indexed by cell
+        # The heuristic of each cell, and the successors of each cell by the last move
+        # The tables are kept between calls (see update_body), the Manhattan table is kept for the same goal
+        self.free_at = []
+        self.base = 0
+        self.occupancy = 0
+        self.goal = None
+        self.manhattan = []
+        self.h = []
+        self.successors = Grid.successor_table(borderSize)
+
+        # Reject the plans after which the head cannot reach the tail
+        self.safety_check = safety_check
+        self.max_rejections = max_rejections
+        self.body_cells = deque()
+        self.unsafe_plan = None
+        self.rejections = 0
+        self.expansion_limit = INFINITY     # The search stops at this number of expansions
+        self.chases = 0                     # Number of single moves taken to chase the tail
+
+        # The weighted heuristic of the anytime search, scale[h] = int(weight * h) is kept for every weight
+        # (h is at most 2 * borderSize for Manhattan, and the length of a path for the distance field)
+        # The moves to the deepest expanded node, and whether the last search stopped at the deadline
+        self.scales = {}
+        self.scale = []
+        self.max_h = 2 * borderSize if self.distance_field is None else borderSize * borderSize + 2 * borderSize
+        self.best_node = None
+        self.partial = []
+        self.deadline = None
+        self.late = False
+        self.timed_out = False
+        self.pops = 0
 
     # This function find the path and returns it
     # Return a list of directions
-    # Return an empty list if no solution found
-    def find_path(self, beginning_pos, goal_pos, direction: Direction, snake_whole_body, snake_length):
+    # Return an empty list if no solution found, or if the search stops at the deadline (perf_counter_ns)
+    # The tables of the last search are reused if reuse_tables is True (i.e., the same snake and goal again)
+    def find_path(self, beginning_pos, goal_pos, direction: Direction, snake_whole_body, snake_length,
+                  weight=1, deadline=None, reuse_tables=False):
         print(f'Finding a path from {beginning_pos[0]} , {beginning_pos[1]} to {goal_pos[0]}, {goal_pos[1]}')
+        size = self.borderSize
+        beginning = Grid.encode(beginning_pos, size)
+        goal = Grid.encode(goal_pos, size)
+
         # Reset
-        self.frontier = queue.PriorityQueue()
+        self.closed = set()
+        self.expansions = 0
+        self.unsafe_plan = None
+        self.rejections = 0
+        self.expansion_limit = INFINITY
+        if not reuse_tables or not self.free_at:
+            self.__update_body(snake_whole_body)
+            if goal != self.goal:
+                self.goal = goal
+                self.manhattan = Grid.manhattan_table(size, goal)
+            self.h = self.manhattan
+            if self.distance_field is not None:
+                self.h = self.distance_field.heuristic(goal, self.__walls(beginning), self.manhattan)
+        if weight not in self.scales:
+            self.scales[weight] = [int(weight * h) for h in range(self.max_h)]
+        self.scale = self.scales[weight]
+        self.deadline = deadline
+        self.late = False
+        self.timed_out = False
+        self.pops = 0
 
         # Create a node for beginning pos
         # This the direction of the first movement cannot be changed
-        dis = self.__manhattan_distance(beginning_pos, goal_pos)
-        beginning_node = Node(dis, [beginning_pos], [direction])
+        beginning_node = Node(self.scale[self.h[beginning]], beginning, Grid.MOVE_OF[direction])
+        beginning_node.trail = Bitboard.bit_of(beginning)
+        self.best_node = None
+
+        if self.threaded:
+            result = self.__find_path_threaded(beginning_node, snake_length, goal)
+        elif self.frontier_type == 'bucket':
+            result = self.__find_path_bucket(beginning_node, snake_length, goal, deadline)
+        else:
+            result = self.__find_path_heap(beginning_node, snake_length, goal, deadline)
+
+        self.partial = [Grid.MOVES[move] for move in self.best_node.getMoves()] if self.best_node else []
+        if result is None and not self.timed_out:
+            if self.safety_check:
+                result = self.__chase_tail(beginning_node, snake_length)
+            if result is None:
+                result = self.unsafe_plan
+        if result is None:
+            if not self.timed_out:
+                print("No solution found")
+            return []
+        return [Grid.MOVES[move] for move in result]
+
+    # Runs the search on a plain heap queue in the calling thread
+    def __find_path_heap(self, beginning_node, snake_length, goal, deadline):
+        self.frontier = [beginning_node]
+
+        while self.frontier:
+            if deadline is not None and self.__past_deadline(deadline):
+                return None
+            if self.expansions >= self.expansion_limit:
+                return None
+            path_node = heapq.heappop(self.frontier)
+            solution, children = self.__expand(path_node, snake_length, goal)
+
+            if solution is not None:
+                return solution
+            for node_new in children:
+                heapq.heappush(self.frontier, node_new)
+
+        return None
+
+    # Runs the search on a bucket queue in the calling thread
+    def __find_path_bucket(self, beginning_node, snake_length, goal, deadline):
+        # The buckets are allocated once and reused by every search, more are added if the weight needs them
+        self.frontier = self.buckets
+        self.frontier.clear()
+        self.frontier.push(beginning_node.f_value, beginning_node)
+
+        while self.frontier:
+            if deadline is not None and self.__past_deadline(deadline):
+                return None
+            if self.expansions >= self.expansion_limit:
+                return None
+            path_node = self.frontier.pop()
+            solution, children = self.__expand(path_node, snake_length, goal)
+
+            if solution is not None:
+                return solution
+            for node_new in children:
+                self.frontier.push(node_new.f_value, node_new)
+
+        return None
+
+    # Runs the search by expanding four nodes at a time in separate threads
+    def __find_path_threaded(self, beginning_node, snake_length, goal):
+        self.frontier = queue.PriorityQueue()
+        self.result = queue.Queue()
         self.frontier.put(beginning_node)
 
         # Loop until the frontier is empty
         while not self.frontier.empty():
-            thread1 = threading.Thread(target=self.a_star_logic, args= (snake_whole_body, snake_length, goal_pos, direction))
-            thread2 = threading.Thread(target=self.a_star_logic, args= (snake_whole_body, snake_length, goal_pos, direction))
-            thread3 = threading.Thread(target=self.a_star_logic, args= (snake_whole_body, snake_length, goal_pos, direction))
-            thread4 = threading.Thread(target=self.a_star_logic, args= (snake_whole_body, snake_length, goal_pos, direction))
+            thread1 = threading.Thread(target=self.a_star_logic, args= (snake_length, goal))
+            thread2 = threading.Thread(target=self.a_star_logic, args= (snake_length, goal))
+            thread3 = threading.Thread(target=self.a_star_logic, args= (snake_length, goal))
+            thread4 = threading.Thread(target=self.a_star_logic, args= (snake_length, goal))
 
             thread1.start()
             thread2.start()
@@ -92,128 +284,258 @@ class AStar:
             if not self.result.empty():
                 return self.result.get()
 
-        print("No solution found")
-        return []
+        return None
+
+    # A new game builds the tables of the body again
+    def reset(self):
+        self.body_cells = deque()
+        self.free_at = []
 
-    def a_star_logic(self, snake_whole_body, snake_length, goal_pos, direction):
+    def stats(self):
+        return {'expansions': self.expansions, 'rejections': self.rejections, 'chases': self.chases}
+
+    def a_star_logic(self, snake_length, goal):
         # Select a path
-        path_node = self.frontier.get()
+        try:
+            path_node = self.frontier.get_nowait()
+        except queue.Empty:
+            return
 
         if not path_node or path_node is None:
             return
 
-        path = path_node.path
-        head_pos = path[len(path) - 1]
-        # print(f"Path with f-value {path_node.f_value} has been selected")
+        solution, children = self.__expand(path_node, snake_length, goal)
+        if solution is not None:
+            return self.result.put(solution)
+
+        # Add the new nodes to frontier
+        for node_new in children:
+            self.frontier.put(node_new)
+
+    # This function expands a node
+    # Return a tuple of (solution, new nodes)
+    # The solution is the list of moves if the node meets the goal, None otherwise
+    # The list of new nodes is empty if the node is pruned
+    def __expand(self, path_node, snake_length, goal):
+        cell = path_node.cell
+        depth = path_node.depth
 
         # Prune if the path length is too long (i.e., over the size of the board)
-        if self.__path_too_long(path):
-            # print("Pruned because of too long")
-            return
+        if self.__path_too_long(depth):
+            return None, []
 
         # Check is the path valid (i.e., does not collide with anything)
-        # Prune this path if invalid
-        if self.__isCollide(head_pos, snake_whole_body, path, snake_length):
-            return
+        # Prune this path if invalid, the beginning pos is the current head so it is never checked
+        # The wall is never hit as the successor table only holds cells on the board
+        if depth > 0 and self.__isCollide(cell, path_node, snake_length):
+            return None, []
+
+        # Skip the path if another path already expanded the same state
+        if not self.__close(cell, depth, snake_length):
+            return None, []
 
         # Return the solution path if it meets the goal
-        if self.__isGoal(head_pos, goal_pos):
-            return self.result.put(path_node.directions[1:])
+        if cell == goal:
+            moves = path_node.getMoves()
+            if self.safety_check and not self.__isTail_reachable(path_node):
+                if self.timed_out:
+                    return None, []
+                self.rejections += 1
+                if self.unsafe_plan is None:
+                    self.unsafe_plan = moves
+                    self.expansion_limit = self.expansions + self.expansions // 4
+                # No more plans are tried, the search stops before the next node
+                if self.rejections >= self.max_rejections:
+                    self.expansion_limit = self.expansions
+                return None, []
+            return moves, []
+
+        # Keep the deepest safe node as the partial plan (the closest to the goal if tie)
+        # The beginning node is not a plan
+        best = self.best_node
+        if depth > 0 and (best is None or depth > best.depth or
+                          (depth == best.depth and self.h[cell] < self.h[best.cell])):
+            self.best_node = path_node
 
         # Add neighbour nodes to the frontier
         # Add every direction except the opposite direction
-        dir_list = self.__prune_direction(direction, head_pos)
-
-        for d in dir_list:
-            # Generate a new path and create a node with the new path
-            path_new = path.copy()
-            head_new = self.__new_head(head_pos, d)
-            path_new.append(head_new)
-
-            directions_new = path_node.directions.copy()
-            directions_new.append(d)
+        h = self.h
+        scale = self.scale
+        children = []
+        trail = path_node.trail if depth + 1 < snake_length else 0
+        for move, cell_new in self.successors[cell][path_node.move]:
+            # Create a node pointing back to the current node
             # The cost = length of path
-            node_new = Node(self.__f_value(head_new, goal_pos, len(path_new)), path_new, directions_new)
-
-            # Add the new node to frontier
-            self.frontier.put(node_new)
-
-        return
-
-
-    def __path_too_long(self, path):
+            node_new = Node(scale[h[cell_new]] + depth + 1, cell_new, move, path_node)
+            node_new.close = self.__isClose_to_body(cell_new, depth + 1)
+            if trail:
+                node_new.trail = trail | (1 << cell_new)
+            children.append(node_new)
+
+        return None, children
+
+    # This function picks a single move after which the head can still reach its tail
+    # The farthest from the goal is taken, it leaves the body more moves to clear the way
+    # Game asks again once the move is made, the tail has moved on by then and the goal may be safe to reach
+    # Return the move as a plan, None if no move keeps the tail in reach
+    def __chase_tail(self, beginning_node, snake_length):
+        best = None
+        for move, cell in self.successors[beginning_node.cell][beginning_node.move]:
+            node = Node(0, cell, move, beginning_node)
+            if self.__isCollide(cell, node, snake_length) or not self.__isTail_reachable(node, False):
+                continue
+            if best is None or self.h[cell] > self.h[best.cell]:
+                best = node
+        if best is None:
+            return None
+        self.chases += 1
+        return [best.move]
+
+    # The clock is read on the first node, then once every 4 nodes
+    # Past the deadline the search stops as soon as there is a partial plan (i.e., at least one safe move)
+    def __past_deadline(self, deadline):
+        self.pops += 1
+        if self.pops & 3 == 1 and not self.late:
+            self.late = time.perf_counter_ns() >= deadline
+        if self.late and self.best_node is not None:
+            self.timed_out = True
+        return self.timed_out
+
+    # Add the state into the closed set
+    # Return False if the state has been expanded before
+    def __close(self, cell, step, length):
+        state = cell * (length + 1) + min(step, length)
+        with self.closed_lock:
+            if state in self.closed:
+                return False
+            self.closed.add(state)
+            self.expansions += 1
+        return True
+
+    def __path_too_long(self, depth):
         path_limit = self.borderSize * self.borderSize
-        if len(path) > path_limit:
+        if depth >= path_limit:
             return True
         return False
 
-    def __isCollide(self, head_pos, snake_whole_body, path, length):
-        return self.__isCollide_wall(head_pos) or self.__isCollide_new_body(head_pos, path, length) or \
-               self.__isCollide_old_body(head_pos, snake_whole_body, length)
-
-    def __isCollide_old_body(self, head_pos, snake_whole_body, length):
-        snake_whole_body_in_length = snake_whole_body[-length:]
-        if head_pos in snake_whole_body_in_length:
-            print("Pruned because of colliding old body")
-            return True
+    # This function brings the tables of the body up to date with snake_whole_body
+    # If the snake has made a single move since the last call (the tail, the neck and the head are compared),
+    # only the old tail and the new head are updated, otherwise the tables are built again
+    def __update_body(self, snake_whole_body):
+        size = self.borderSize
+        cells = self.body_cells
+        length = len(snake_whole_body)
+        if length > 2 and len(cells) > 2:
+            tail = Grid.encode(snake_whole_body[0], size)
+            neck = Grid.encode(snake_whole_body[-2], size)
+            head = Grid.encode(snake_whole_body[-1], size)
+            if length == len(cells) and tail == cells[0] and neck == cells[-2] and head == cells[-1]:
+                return
+            moved = length == len(cells) and tail == cells[1]
+            grew = length == len(cells) + 1 and tail == cells[0]
+            if neck == cells[-1] and (moved or grew):
+                # The old tail is vacated one move earlier than the rest of the body
+                if moved:
+                    self.occupancy &= ~Bitboard.bit_of(cells.popleft())
+                    self.base += 1
+                cells.append(head)
+                self.free_at[head] = self.base + length
+                self.occupancy |= Bitboard.bit_of(head)
+                return
+
+        # The i-th segment from the tail is vacated after i + 1 moves, a free cell has 0
+        self.body_cells = deque(Grid.encode(pos, size) for pos in snake_whole_body)
+        self.free_at = [0] * (size * size)
+        self.base = 0
+        for i, cell in enumerate(self.body_cells):
+            self.free_at[cell] = i + 1
+        self.occupancy = Bitboard.from_cells(self.body_cells)
+
+    # This function simulates the body at the end of the path, right after the food is eaten if grows
+    # Then flood fills from the head, a body cell can be entered once it has been vacated
+    # Only the cells that the path changes are taken out of (or put into) the occupancy of the body
+    # Past the deadline the fill gives up (timed_out) once there is a partial plan
+    # Return True iff the tail can be reached (i.e., the head can follow its tail forever)
+    def __isTail_reachable(self, goal_node, grows=True):
+        cells = self.body_cells
+        length = len(cells) + (1 if grows else 0)
+
+        path = []
+        node = goal_node
+        while node.parent is not None and len(path) < length:
+            path.append(node.cell)
+            node = node.parent
+        path.reverse()
+
+        # The first segments of the old body are vacated by the path (all but one if the snake grows)
+        if len(path) < length:
+            vacated = len(path) - (1 if grows else 0)
+            occupancy = (self.occupancy & ~Bitboard.from_cells(itertools.islice(cells, vacated))) | \
+                Bitboard.from_cells(path)
+            tail = cells[vacated]
+            segments = itertools.chain(itertools.islice(cells, vacated, None), path)
+        else:
+            occupancy = Bitboard.from_cells(path)
+            tail = path[0]
+            segments = iter(path)
+
+        # The i-th segment from the tail is vacated after i + 1 moves
+        # Breadth first over bitboards, a whole layer of the fill is expanded at once
+        size = self.borderSize
+        deadline = self.deadline
+        free = Bitboard.masks(size)[0] & ~occupancy
+        tail = Bitboard.bit_of(tail)
+        visited = frontier = Bitboard.bit_of(path[-1])
+        step = 0
+        while frontier:
+            reach = Bitboard.neighbours(frontier, size)
+            if reach & tail:
+                return True
+            segment = next(segments, None)
+            if segment is not None:
+                free |= Bitboard.bit_of(segment)
+            step += 1
+            if deadline is not None and step & 15 == 0 and self.best_node is not None and \
+                    time.perf_counter_ns() >= deadline:
+                self.late = self.timed_out = True
+                return False
+            frontier = reach & free & ~visited
+            visited |= frontier
         return False
 
-    def __isCollide_new_body(self, head_pos, path, length):
-        path_in_length = path[-length + 1:0]
-        if head_pos in path_in_length:
-            print("Pruned because of colliding new body")
-            return True
+    # A body cell is a wall for the distance field if it is still occupied when the head can first get there
+    def __walls(self, beginning):
+        reach = Grid.manhattan_table(self.borderSize, beginning)
+        base = self.base
+        return bytearray(f - base > r for f, r in zip(self.free_at, reach))
+
+    def __isCollide(self, cell, path_node, length):
+        return self.__isCollide_old_body(cell, path_node.depth) or self.__isCollide_new_body(cell, path_node, length)
+
+    # A cell of the old body is occupied until the step it is vacated
+    def __isCollide_old_body(self, cell, depth):
+        return self.free_at[cell] - self.base > depth
+
+    # The new body is the last (length - 1) positions of the path before the head
+    # While the path is shorter than the snake, the new body is the whole path, a single bit of the trail of the parent
+    # Only a deeper node walks its parents
+    def __isCollide_new_body(self, cell, path_node, length):
+        if path_node.depth < length:
+            return (path_node.parent.trail >> cell) & 1 == 1
+        node = path_node.parent
+        for i in range(length - 1):
+            if node is None:
+                break
+            if node.cell == cell:
+                return True
+            node = node.parent
         return False
 
-    def __isCollide_wall(self, head_pos):
-        x, y = head_pos
-        if x < 0 or x >= self.borderSize or y < 0 or y >= self.borderSize:
-            print("Pruned because of colliding wall")
-            return True
+    # This function checks if any neighbour of the cell is still occupied by the old body at the depth
+    def __isClose_to_body(self, cell, depth):
+        free_at = self.free_at
+        depth += self.base
+        for move, neighbour in Grid.neighbour_table(self.borderSize)[cell]:
+            if free_at[neighbour] > depth:
+                return True
         return False
-
-    def __f_value(self, head_pos, goal_pos, cost):
-        return self.__manhattan_distance(head_pos, goal_pos) + cost
-
-    def __new_head(self, pos, direction):
-        x, y = pos
-        if direction == Direction.UP:
-            y -= 1
-        elif direction == Direction.DOWN:
-            y += 1
-        elif direction == Direction.RIGHT:
-            x += 1
-        else:
-            x -= 1
-
-        return x, y
-
-    def __prune_direction(self, direction, head_pos):
-        dir_list = [Direction.UP, Direction.DOWN, Direction.RIGHT, Direction.LEFT]
-        x, y = head_pos
-        limit = self.borderSize - 1
-
-        if direction == Direction.UP or y >= limit:
-            dir_list.remove(Direction.DOWN)
-        if direction == Direction.DOWN or y <= 0:
-            dir_list.remove(Direction.UP)
-        if direction == Direction.RIGHT or x >= limit:
-            dir_list.remove(Direction.LEFT)
-        if direction == Direction.LEFT or x <= 0:
-            dir_list.remove(Direction.RIGHT)
-
-        return dir_list
-
-    def __isGoal(self, head_pos, goal_pos):
-        return head_pos == goal_pos
-
-    def m(self, a, b):
-        return self.__manhattan_distance(a, b)
-
-    def __manhattan_distance(self, node_pos, goal_pos):
-        node_x, node_y = node_pos
-        goal_x, goal_y = goal_pos
-
-        return abs(goal_x - node_x) + abs(goal_y - node_y)
-
-
@@ -0,0 +1,141 @@
+"""
+This module defines the protocol between Game and the AI agents, and a registry of the agents by name
+Characteristics:
+    -   An agent is asked with the state of the game:
+            (beginning_pos, goal_pos, direction, snake_whole_body, snake_length)
+        the body runs from the tail to the head and is only valid until the snake moves again
+    -   Two kinds of agents (see Agent.incremental)
+    -   find_path is abstract, the defaults of Agent are built on it, so an agent only has to implement find_path
+    -   An object that only has find_path (and maybe incremental) is wrapped into an Adapter by as_agent
+    -   The registry maps a name to a factory taking the board size and the options of the agent
+        The agents of this package are imported when they are first created, so importing Game stays cheap
+
+Methods:
+    Agent:
+        -   plan(beginning_pos, goal_pos, direction, snake_whole_body, snake_length) --> Return a list of directions
+        -   next_move(beginning_pos, goal_pos, direction, snake_whole_body, snake_length) --> Return a direction,
+            None if there is no move
+        -   food_spawned(beginning_pos, goal_pos, direction, snake_whole_body, snake_length) --> Game tells an
+            incremental agent a new food has spawned (the state after the move of this tick), before it is asked
+        -   reset() --> Forget what was kept from the last game
+        -   stats() --> Return a dict of counters of the agent
+        -   close() --> Release what the agent holds (e.g., a worker thread), the agent is not asked again
+    Registry:
+        -   register(name, factory)
+        -   create(name, size, **options)
+        -   names()
+        -   as_agent(ai)
+"""
+import abc
+import importlib
+
+
+class Agent(abc.ABC):
+    # incremental = False --> Game asks for a whole plan (plan) when a new food appears, or when the plan runs out,
+    #                         and replays it
+    # incremental = True  --> Game asks for the next move (next_move) at the start of every tick and only queues
+    #                         that move, so the agent can repair its plan as the snake moves
+    incremental = False
+
+    # Return a list of directions from the head (the whole plan, or at least its first move if incremental)
+    @abc.abstractmethod
+    def find_path(self, beginning_pos, goal_pos, direction, snake_whole_body, snake_length):
+        pass
+
+    def plan(self, beginning_pos, goal_pos, direction, snake_whole_body, snake_length):
+        return self.find_path(beginning_pos, goal_pos, direction, snake_whole_body, snake_length)
+
+    def next_move(self, beginning_pos, goal_pos, direction, snake_whole_body, snake_length):
+        path = self.plan(beginning_pos, goal_pos, direction, snake_whole_body, snake_length)
+        return path[0] if path else None
+
+    # An agent may start planning for the new food here (e.g., on another thread), nothing is returned
+    def food_spawned(self, beginning_pos, goal_pos, direction, snake_whole_body, snake_length):
+        pass
+
+    def reset(self):
+        pass
+
+    def close(self):
+        pass
+
+    # Every agent reports the nodes expanded by its last search if it counts them
+    def stats(self):
+        stats = {}
+        if hasattr(self, 'expansions'):
+            stats['expansions'] = self.expansions
+        return stats
+
+
+class Adapter(Agent):
+    """
+    This class wraps an object that only implements find_path into an Agent
+    reset, stats and close are forwarded if the object has them
+    """
+
+    def __init__(self, ai):
+        self.ai = ai
+        self.incremental = getattr(ai, 'incremental', False)
+
+    def find_path(self, beginning_pos, goal_pos, direction, snake_whole_body, snake_length):
+        return self.ai.find_path(beginning_pos, goal_pos, direction, snake_whole_body, snake_length)
+
+    def food_spawned(self, beginning_pos, goal_pos, direction, snake_whole_body, snake_length):
+        if hasattr(self.ai, 'food_spawned'):
+            self.ai.food_spawned(beginning_pos, goal_pos, direction, snake_whole_body, snake_length)
+
+    def reset(self):
+        if hasattr(self.ai, 'reset'):
+            self.ai.reset()
+
+    def close(self):
+        if hasattr(self.ai, 'close'):
+            self.ai.close()
+
+    def stats(self):
+        if hasattr(self.ai, 'stats'):
+            return self.ai.stats()
+        stats = {}
+        if hasattr(self.ai, 'expansions'):
+            stats['expansions'] = self.ai.expansions
+        return stats
+
+
+# name --> factory(size, **options)
+registry = {}
+
+
+def register(name, factory):
+    registry[name] = factory
+
+
+# This function creates the agent registered under name for a board of size x size
+# Raise a KeyError naming the registered agents if the name is unknown
+def create(name, size, **options):
+    if name not in registry:
+        raise KeyError(f'Unknown agent {name!r}, the registered agents are {", ".join(names())}')
+    return as_agent(registry[name](size, **options))
+
+
+def names():
+    return sorted(registry)
+
+
+def as_agent(ai):
+    return ai if isinstance(ai, Agent) else Adapter(ai)
+
+
+# This function returns a factory importing the class from its module on the first call
+def lazy(module, cls):
+    def factory(size, **options):
+        return getattr(importlib.import_module(module), cls)(size, **options)
+    return factory
+
+
+register('astar', lazy('AI_Agents.AStar', 'AStar'))
+register('background', lazy('AI_Agents.BackgroundPlanner', 'BackgroundPlanner'))
+register('anytime_astar', lazy('AI_Agents.AnytimeAStar', 'AnytimeAStar'))
+register('dstar_lite', lazy('AI_Agents.DStarLite', 'DStarLite'))
+register('hamiltonian', lazy('AI_Agents.HamiltonianCycle', 'HamiltonianCycle'))
+register('monte_carlo', lazy('AI_Agents.MonteCarlo', 'MonteCarlo'))
+register('strips', lazy('AI_Agents.STRIPS', 'STRIPS'))
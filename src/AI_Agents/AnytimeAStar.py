@@ -0,0 +1,95 @@
+"""
+This class is an AI agent running weighted A* under a time budget on every tick (i.e., an anytime planner)
+Characteristics:
+    -   The budget is given in microseconds, find_path returns once it is spent
+    -   Starts with a high weight to find a path quickly, then tightens the weight while there is time left
+    -   Returns the best complete path found within the budget,
+        or the best safe partial plan (the path to the deepest expanded node) if none was found
+    -   The weight reached is kept for the same food, so the plan keeps being refined on the next tick
+    -   If no complete path was found within the budget, the weight is loosened again for the next tick
+    -   Records the latency of every call, see latency_percentile(p)
+
+Methods:
+    Public:
+        -   find_path(beginning_pos, goal_pos, direction, snake_whole_body, snake_length)
+        -   latency_percentile(p)   --> Latency in microseconds
+        -   reset(), stats()    --> See Agent
+"""
+import time
+
+from AI_Agents.Agent import Agent
+from AI_Agents.AStar import AStar
+from Direction import Direction
+
+
+class AnytimeAStar(Agent):
+    incremental = True
+
+    def __init__(self, borderSize, time_budget_us=2000, initial_weight=3.0, weight_step=0.5,
+                 frontier='bucket', heuristic='manhattan'):
+        self.borderSize = borderSize
+        self.time_budget_us = time_budget_us
+        self.initial_weight = initial_weight
+        self.weight_step = weight_step
+        self.search = AStar(borderSize, frontier=frontier, heuristic=heuristic)
+
+        self.goal = None
+        self.weight = initial_weight
+        self.latencies = []     # Microseconds of every call
+        self.partial_plans = 0  # Number of calls that returned a partial plan
+
+    # This function returns the best plan found within the time budget
+    # Return a list of directions
+    # Return an empty list if there is no safe move at all
+    def find_path(self, beginning_pos, goal_pos, direction: Direction, snake_whole_body, snake_length):
+        start = time.perf_counter_ns()
+        deadline = start + self.time_budget_us * 1000
+
+        # Start again from the initial weight for a new food
+        if goal_pos != self.goal:
+            self.goal = goal_pos
+            self.weight = self.initial_weight
+
+        best = None
+        searched = False
+        while True:
+            path = self.search.find_path(beginning_pos, goal_pos, direction, snake_whole_body, snake_length,
+                                         weight=self.weight, deadline=deadline, reuse_tables=searched)
+            searched = True
+            if self.search.timed_out:
+                break
+
+            # A complete search without a path cannot be improved by a lower weight
+            if not path:
+                break
+            best = path
+            if self.weight <= 1 or time.perf_counter_ns() >= deadline:
+                break
+            self.weight = max(1, self.weight - self.weight_step)
+
+        if best is None:
+            if self.search.timed_out:
+                # Loosen the weight so the next tick is more likely to find a complete path
+                self.weight = min(self.initial_weight, self.weight + self.weight_step)
+            best = self.search.partial
+            self.partial_plans += 1
+
+        self.latencies.append((time.perf_counter_ns() - start) / 1000)
+        return best
+
+    # Return the p-th percentile (0 - 100) of the latency in microseconds
+    def latency_percentile(self, p):
+        if not self.latencies:
+            return 0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+    # A new game starts again from the initial weight, the latencies are kept
+    def reset(self):
+        self.goal = None
+        self.weight = self.initial_weight
+        self.search.reset()
+
+    def stats(self):
+        return {'expansions': self.search.expansions, 'weight': self.weight, 'partial_plans': self.partial_plans,
+                'latency_p50_us': self.latency_percentile(50), 'latency_p99_us': self.latency_percentile(99)}
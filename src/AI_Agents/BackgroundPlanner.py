@@ -0,0 +1,255 @@
+"""
+This class is an AI agent running another agent on a background thread, so planning never stalls a tick
+Characteristics:
+    -   Game asks it for the next move on every tick (incremental), it never plans on the game loop itself
+    -   The worker thread plans with the wrapped agent (any registered agent, AStar by default):
+        0.  A request is sent as soon as a new food spawns (Game calls food_spawned with the state after the move
+            that ate the last food), or when the current plan runs out, from the state predicted after the move
+            of this tick (the plan is ready to be used on the next tick)
+        1.  The worker copies the body when the request is sent, the view of Game is only valid for one tick
+        2.  The worker validates the plan against the predicted body on its own Snake, the plan is cut at the
+            first move that collides, each step keeps the head it is expected to start from
+        3.  Only the latest request is kept, a plan for an older request (or an older game) is dropped
+    -   The game loop only consumes ready plans:
+        0.  The next step is taken if the head is where the plan expected it and the move is still safe
+        1.  Otherwise (no plan, the worker is late, or the plan has gone stale) a reflex move is taken:
+            the safe move closest to the food by Manhattan distance (the tail moves out of the way)
+    -   wait is the time (seconds) a tick may block for a plan in flight, 0 by default (never block)
+    -   The thread is started on the first request and is a daemon, close() (called by Game.close()) stops it
+
+Methods:
+    Public:
+        -   find_path(beginning_pos, goal_pos, direction, snake_whole_body, snake_length) --> Return the next move
+        -   food_spawned(beginning_pos, goal_pos, direction, snake_whole_body, snake_length)
+        -   reset(), stats()    --> See Agent
+        -   close()
+"""
+import threading
+import time
+
+import Snake
+from AI_Agents import Grid
+from AI_Agents.Agent import Agent, as_agent, create
+from Direction import Direction
+
+
+class BackgroundPlanner(Agent):
+    incremental = True
+
+    def __init__(self, borderSize, agent='astar', wait=0.0, **options):
+        self.borderSize = borderSize
+        self.agent = create(agent, borderSize, **options) if isinstance(agent, str) else as_agent(agent)
+        self.wait = wait
+        self.neighbours = Grid.neighbour_table(borderSize)
+        self.simulation = Snake.Snake(borderSize)     # Only used by the worker thread
+
+        # Shared with the worker, guarded by condition
+        self.condition = threading.Condition()
+        self.thread = None
+        self.request = None         # (generation, (head cell, move) or None, state) waiting for the worker
+        self.ready = None           # (generation, goal, steps) finished by the worker
+        self.generation = 0         # Bumped on every request and on reset, a plan of an older one is dropped
+        self.resetPending = False
+        self.closed = False
+
+        # Only used by the game loop
+        self.inflight = None        # Goal of the request in flight, None if the worker is idle
+        self.goal = None            # Goal of the plan being followed
+        self.steps = []             # [(head cell, move)] of the plan being followed
+        self.step = 0
+
+        self.planned = 0            # Number of moves taken from a plan
+        self.reflexes = 0           # Number of reflex moves
+        self.dropped = 0            # Number of plans dropped as stale
+        self.plans = 0              # Number of plans received from the worker
+        self.blocked = 0.0          # Time the game loop spent waiting for a plan (seconds)
+
+    # This function returns the next move as a list of one direction
+    # Return an empty list if every move collides right away
+    def find_path(self, beginning_pos, goal_pos, direction: Direction, snake_whole_body, snake_length):
+        size = self.borderSize
+        head = Grid.encode(beginning_pos, size)
+        goal = Grid.encode(goal_pos, size) if goal_pos is not None else None
+
+        self.__receive()
+        move = self.__follow(head, goal, snake_whole_body)
+        if move is None and self.wait > 0 and self.inflight is not None and self.inflight == goal:
+            start = time.perf_counter()
+            with self.condition:
+                self.condition.wait_for(lambda: self.ready is not None, self.wait)
+            self.blocked += time.perf_counter() - start
+            self.__receive()
+            move = self.__follow(head, goal, snake_whole_body)
+
+        if move is not None:
+            self.planned += 1
+        else:
+            move = self.__reflex(head, goal, Grid.MOVE_OF[direction], snake_whole_body)
+            if move is None:
+                return []
+            self.reflexes += 1
+
+        # Plan ahead from the state after this move, unless the worker is already on this food
+        # or this move eats it (the next food is not known yet)
+        following = self.goal == goal and self.step < len(self.steps)
+        if goal is not None and not following and self.inflight != goal:
+            self.__submit(head, goal, move, direction, snake_whole_body)
+        return [Grid.MOVES[move]]
+
+    # The request for a new food is sent from the state Game is in right now, the plan starts from this head
+    def food_spawned(self, beginning_pos, goal_pos, direction: Direction, snake_whole_body, snake_length):
+        size = self.borderSize
+        goal = Grid.encode(goal_pos, size)
+        if self.inflight != goal:
+            self.__submit(Grid.encode(beginning_pos, size), goal, None, direction, snake_whole_body)
+
+    # A new game drops the plans and the requests of the last one, the wrapped agent is reset by the worker
+    def reset(self):
+        with self.condition:
+            self.generation += 1
+            self.request = None
+            self.ready = None
+            self.resetPending = True
+        self.inflight = None
+        self.goal = None
+        self.steps = []
+        self.step = 0
+
+    def stats(self):
+        return {'plans': self.plans, 'planned_moves': self.planned, 'reflex_moves': self.reflexes,
+                'dropped_plans': self.dropped, 'blocked_ms': self.blocked * 1000}
+
+    # This function stops the worker thread, then closes the wrapped agent
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.agent.close()
+
+    # Take the plan the worker has finished, if any
+    def __receive(self):
+        with self.condition:
+            ready = self.ready
+            self.ready = None
+            generation = self.generation
+        if ready is None or ready[0] != generation:
+            return
+        self.inflight = None
+        self.plans += 1
+        self.goal = ready[1]
+        self.steps = ready[2]
+        self.step = 0
+
+    # Return the next move of the plan, None if the plan does not apply to this state anymore
+    def __follow(self, head, goal, snake_whole_body):
+        if self.goal != goal or self.step >= len(self.steps):
+            return None
+        # The first step is the move the request was sent with, it is skipped once that move has been made
+        if self.steps[self.step][0] != head and self.step + 1 < len(self.steps) and self.steps[self.step + 1][0] == head:
+            self.step += 1
+        expected, move = self.steps[self.step]
+        if expected != head or not self.__isSafe(head, move, snake_whole_body):
+            self.dropped += 1
+            self.steps = []
+            return None
+        self.step += 1
+        return move
+
+    # The move that stays on the board and does not run into the body, closest to the goal
+    def __reflex(self, head, goal, last, snake_whole_body):
+        h = Grid.manhattan_table(self.borderSize, goal) if goal is not None else None
+        best = None
+        for move, n in self.neighbours[head]:
+            if move == Grid.OPPOSITE[last] or not self.__isSafe(head, move, snake_whole_body):
+                continue
+            distance = h[n] if h is not None else 0
+            if best is None or distance < best[0]:
+                best = (distance, move)
+        return best[1] if best is not None else None
+
+    # The tail moves out of the way, the head can enter the cell it leaves
+    def __isSafe(self, head, move, snake_whole_body):
+        size = self.borderSize
+        for m, n in self.neighbours[head]:
+            if m == move:
+                pos = Grid.decode(n, size)
+                return pos not in snake_whole_body or pos == snake_whole_body[0]
+        return False
+
+    # This function sends the state after move to the worker (the state as it is if move is None),
+    # it replaces a request not started yet
+    def __submit(self, head, goal, move, direction, snake_whole_body):
+        if self.closed:
+            return
+        size = self.borderSize
+        if move is None:
+            origin = None
+            body = list(snake_whole_body)
+        else:
+            dx, dy = Grid.OFFSETS[move]
+            x, y = Grid.decode(head, size)
+            if (y + dy) * size + x + dx == goal:
+                return
+            origin = (head, move)
+            direction = Grid.MOVES[move]
+            body = list(snake_whole_body)[1:]
+            body.append((x + dx, y + dy))
+        state = (body[-1], Grid.decode(goal, size), direction, body, len(body))
+
+        with self.condition:
+            self.generation += 1
+            self.request = (self.generation, origin, state)
+            self.condition.notify()
+        self.inflight = goal
+
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.__work, daemon=True)
+            self.thread.start()
+
+    def __work(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.request is not None or self.closed)
+                if self.closed:
+                    return
+                generation, origin, state = self.request
+                self.request = None
+                if self.resetPending:
+                    self.agent.reset()
+                    self.resetPending = False
+
+            steps = self.__validate(state, self.agent.plan(*state))
+            if origin is not None:
+                steps.insert(0, origin)
+
+            with self.condition:
+                if generation == self.generation:
+                    self.ready = (generation, Grid.encode(state[1], self.borderSize), steps)
+                    self.condition.notify_all()
+
+    # This function plays the plan on the predicted body, returns the steps up to the first move that collides
+    # (or up to the food)
+    def __validate(self, state, path):
+        size = self.borderSize
+        beginning_pos, goal_pos, direction, body, length = state
+        simulation = self.simulation
+        simulation.load(body, direction)
+        steps = []
+        for direction in path:
+            head = Grid.encode(simulation.getHead(), size)
+            move = Grid.MOVE_OF[direction]
+            if all(m != move for m, n in self.neighbours[head]):
+                break
+            simulation.changeDirection(direction)
+            if simulation.getDirection() is not direction:
+                break
+            ate = simulation.move(goal_pos)
+            if simulation.isBitten():
+                break
+            steps.append((head, move))
+            if ate:
+                break
+        return steps
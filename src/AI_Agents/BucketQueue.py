@@ -0,0 +1,59 @@
+"""
+This class is a priority queue for small non-negative integer priorities (i.e., a bucket queue)
+Characteristics:
+    -   One list (bucket) per priority, so push and pop are O(1)
+    -   The lowest bucket that can be non-empty is remembered, popping only scans forward from it
+    -   Ties are broken deterministically, the item pushed last is popped first (LIFO)
+    -   The buckets are kept between searches, clear() only empties the buckets that were used
+    -   More buckets are added if a priority above max_priority is pushed
+
+Methods:
+    Public:
+        -   push(priority, item)
+        -   pop()   --> Return the item with the lowest priority
+        -   clear()
+"""
+
+
+class BucketQueue:
+    def __init__(self, max_priority):
+        self.buckets = [[] for i in range(max_priority + 1)]
+        self.lowest = len(self.buckets)
+        self.highest = -1
+        self.size = 0
+
+    def push(self, priority, item):
+        if priority >= len(self.buckets):
+            self.buckets.extend([] for i in range(priority + 1 - len(self.buckets)))
+        self.buckets[priority].append(item)
+        self.size += 1
+        if priority < self.lowest:
+            self.lowest = priority
+        if priority > self.highest:
+            self.highest = priority
+
+    # Raise IndexError if the queue is empty
+    def pop(self):
+        if self.size == 0:
+            raise IndexError('pop from an empty bucket queue')
+
+        buckets = self.buckets
+        lowest = self.lowest
+        while not buckets[lowest]:
+            lowest += 1
+        self.lowest = lowest
+        self.size -= 1
+        return buckets[lowest].pop()
+
+    def clear(self):
+        for i in range(min(self.lowest, len(self.buckets)), self.highest + 1):
+            self.buckets[i].clear()
+        self.lowest = len(self.buckets)
+        self.highest = -1
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def __bool__(self):
+        return self.size > 0
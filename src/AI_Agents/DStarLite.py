@@ -0,0 +1,233 @@
+"""
+This class is an AI agent using D* Lite to keep a path to the food while the snake moves
+Characteristics:
+    -   Searches backward from the goal (i.e., food) to the head, so the search tree stays valid as the head advances
+    -   Keeps the search tree between ticks, only the cells that changed since the last call are repaired
+        (i.e., the new neck is blocked and the new tail is unblocked, the old tail was not a wall)
+    -   The walls are kept between ticks as well, after a single move only those two cells are flipped,
+        the body is only read at the tail, the neck and the head
+    -   The whole search is only done again when the goal changes
+    -   Only the next move is returned, Game asks again on the next tick
+    -   Replanning cost per tick scales with the number of changed cells, not the board size or the snake length
+
+Representation:
+    -   A cell is encoded as y * borderSize + x (see Grid)
+    -   The body is treated as walls at the current tick, except the head (the start) and the tail (vacated next move)
+        As the agent is asked again every tick, the tail vacating is handled by the repair
+    -   The cell behind the head is a wall as well for a snake of length 1, the snake cannot turn back
+
+Methods:
+    Public:
+        -   find_path(beginning_pos, goal_pos, direction, snake_whole_body, snake_length) --> Return the next move
+        -   reset() --> See Agent
+"""
+import heapq
+from collections import deque
+
+from AI_Agents import Grid
+from AI_Agents.Agent import Agent
+from Direction import Direction
+
+INFINITY = float('inf')
+
+
+class DStarLite(Agent):
+    incremental = True
+
+    def __init__(self, borderSize):
+        self.borderSize = borderSize
+        self.neighbours = Grid.neighbour_table(borderSize)
+        self.xs = [cell % borderSize for cell in range(borderSize * borderSize)]
+        self.ys = [cell // borderSize for cell in range(borderSize * borderSize)]
+
+        self.goal = None
+        self.start = None
+        self.last = None
+        self.km = 0
+        self.g = []
+        self.rhs = []
+        self.blocked = bytearray(borderSize * borderSize)
+        self.walls = set()
+        self.body = deque()     # The cells of the body at the last call, tail first
+        self.queue = []
+        self.keys = {}          # The current key of every cell in the queue, entries in the heap with other keys are stale
+        self.expansions = 0     # Number of cells expanded by the last call
+
+    # This function returns the next move on a shortest path from the head to the goal
+    # Return a list of one direction
+    # Return an empty list if no solution found
+    def find_path(self, beginning_pos, goal_pos, direction: Direction, snake_whole_body, snake_length):
+        size = self.borderSize
+        start = Grid.encode(beginning_pos, size)
+        goal = Grid.encode(goal_pos, size)
+        changed = self.__update_walls(snake_whole_body, start, Grid.MOVE_OF[direction])
+        self.expansions = 0
+
+        if goal != self.goal:
+            self.__initialize(start, goal)
+        else:
+            self.start = start
+            self.km += self.__h(self.last, start)
+            self.last = start
+            self.__repair(changed)
+
+        self.__compute_shortest_path()
+        move = self.__next_move()
+        return [Grid.MOVES[move]] if move is not None else []
+
+    # The search tree and the body of the last game are dropped, the next call searches from scratch
+    def reset(self):
+        self.goal = None
+        self.body = deque()
+
+    # This function brings the walls up to date with the body, then returns the cells that were flipped
+    # The walls are the body without the head (the start) and the tail (vacated next move)
+    # After a single move only the new neck is blocked and the new tail unblocked (or only the neck if the snake grew),
+    # otherwise the walls are built again from the whole body
+    def __update_walls(self, snake_whole_body, start, last):
+        size = self.borderSize
+        body = self.body
+        length = len(snake_whole_body)
+        if length > 2 and len(body) > 2:
+            tail = Grid.encode(snake_whole_body[0], size)
+            neck = Grid.encode(snake_whole_body[-2], size)
+            if length == len(body) and tail == body[0] and neck == body[-2] and start == body[-1]:
+                return []
+            moved = length == len(body) and tail == body[1]
+            grew = length == len(body) + 1 and tail == body[0]
+            if neck == body[-1] and (moved or grew):
+                changed = [neck]
+                self.walls.add(neck)
+                if moved:
+                    body.popleft()
+                    self.walls.discard(tail)
+                    changed.append(tail)
+                body.append(start)
+                for cell in changed:
+                    self.blocked[cell] ^= 1
+                return changed
+
+        self.body = deque(Grid.encode(pos, size) for pos in snake_whole_body)
+        walls = self.__walls(start, last)
+        changed = walls ^ self.walls
+        self.walls = walls
+        for cell in changed:
+            self.blocked[cell] ^= 1
+        return changed
+
+    # Return the set of blocked cells of the whole body
+    # The snake cannot turn back (Snake.changeDirection ignores it), a snake of length 1 has no neck to block
+    # the cell behind the head, so that cell is blocked for this tick
+    def __walls(self, start, last):
+        body = self.body
+        walls = set(body)
+        if len(body) > 2:
+            walls.discard(body[0])
+        walls.discard(start)
+        if len(body) == 1:
+            for move, n in self.neighbours[start]:
+                if move == Grid.OPPOSITE[last]:
+                    walls.add(n)
+        return walls
+
+    # The walls are kept, only the search starts again
+    def __initialize(self, start, goal):
+        cells = self.borderSize * self.borderSize
+        self.goal = goal
+        self.start = start
+        self.last = start
+        self.km = 0
+        self.g = [INFINITY] * cells
+        self.rhs = [INFINITY] * cells
+        self.queue = []
+        self.keys = {}
+
+        self.rhs[goal] = 0
+        self.__push(goal)
+
+    # Update the vertices next to every cell that has been blocked or unblocked since the last call
+    def __repair(self, changed):
+        for cell in changed:
+            self.__update_vertex(cell)
+            for move, n in self.neighbours[cell]:
+                self.__update_vertex(n)
+
+    def __h(self, a, b):
+        return abs(self.xs[a] - self.xs[b]) + abs(self.ys[a] - self.ys[b])
+
+    def __key(self, cell):
+        m = min(self.g[cell], self.rhs[cell])
+        return m + self.__h(self.start, cell) + self.km, m
+
+    def __push(self, cell):
+        key = self.__key(cell)
+        self.keys[cell] = key
+        heapq.heappush(self.queue, (key, cell))
+
+    # Pop stale entries until the top of the queue is a cell with its current key
+    def __top(self):
+        while self.queue:
+            key, cell = self.queue[0]
+            if self.keys.get(cell) == key:
+                return key, cell
+            heapq.heappop(self.queue)
+        return (INFINITY, INFINITY), None
+
+    # The cost of moving between two cells, a blocked cell cannot be entered or left
+    def __cost(self, a, b):
+        if self.blocked[a] or self.blocked[b]:
+            return INFINITY
+        return 1
+
+    def __update_vertex(self, cell):
+        if cell != self.goal:
+            best = INFINITY
+            for move, n in self.neighbours[cell]:
+                c = self.__cost(cell, n) + self.g[n]
+                if c < best:
+                    best = c
+            self.rhs[cell] = best
+
+        self.keys.pop(cell, None)
+        if self.g[cell] != self.rhs[cell]:
+            self.__push(cell)
+
+    def __compute_shortest_path(self):
+        g = self.g
+        rhs = self.rhs
+        start = self.start
+        while True:
+            key, cell = self.__top()
+            if cell is None or (key >= self.__key(start) and rhs[start] == g[start]):
+                return
+
+            heapq.heappop(self.queue)
+            del self.keys[cell]
+            self.expansions += 1
+
+            new_key = self.__key(cell)
+            if key < new_key:
+                self.__push(cell)
+            elif g[cell] > rhs[cell]:
+                g[cell] = rhs[cell]
+                for move, n in self.neighbours[cell]:
+                    self.__update_vertex(n)
+            else:
+                g[cell] = INFINITY
+                self.__update_vertex(cell)
+                for move, n in self.neighbours[cell]:
+                    self.__update_vertex(n)
+
+    # The cheapest neighbour of the head is the next move on a shortest path, the rest of the path is not built
+    # Return None if the goal cannot be reached
+    def __next_move(self):
+        start = self.start
+        if start == self.goal or (self.g[start] == INFINITY and self.rhs[start] == INFINITY):
+            return None
+        best = INFINITY
+        best_move = None
+        for move, n in self.neighbours[start]:
+            c = self.__cost(start, n) + self.g[n]
+            if c < best:
+                best, best_move = c, move
+        return best_move
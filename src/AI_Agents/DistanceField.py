@@ -0,0 +1,134 @@
+"""
+This class computes the obstacle-aware distance from every cell to the food (i.e., a distance field)
+Characteristics:
+    -   Breadth first wavefront from the food over the free cells, vectorized with NumPy
+    -   Falls back to a plain breadth first search when NumPy is not installed
+    -   Used as a near-perfect heuristic, cells that cannot reach the food keep their Manhattan distance
+    -   Cached per food position and repaired incrementally when the walls change:
+        0.  A new wall that no other cell reaches the food through is removed from the field in place
+        1.  A wall that is gone gets the distance of its nearest neighbour + 1, then the shortcut it opens
+            is spread outward with a breadth first search that only lowers distances
+        2.  The field is only computed again when a new wall is on the wavefront (i.e., another cell relies on it)
+    -   The repaired field is the exact breadth first field, so the heuristic stays admissible
+        (without spreading the shortcuts of the removed walls, the cells behind them would keep a distance too large)
+
+Methods:
+    Public:
+        -   heuristic(goal, walls, fallback)    --> Return the heuristic of every cell as a list
+"""
+from collections import deque
+
+from AI_Agents import Grid
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+UNREACHABLE = -1
+
+
+class DistanceField:
+    def __init__(self, size):
+        self.size = size
+        self.goal = None
+        self.walls = None
+        self.field = None
+        self.computations = 0   # Number of times the whole field has been computed
+
+    # This function returns the heuristic of every cell
+    # walls is a bytearray indexed by cell, the fallback is used for the cells that cannot reach the goal
+    def heuristic(self, goal, walls, fallback):
+        if self.goal != goal or self.walls is None or not self.__repair(walls):
+            self.field = self.__compute(goal, walls)
+            self.goal = goal
+            self.computations += 1
+        self.walls = bytearray(walls)
+
+        return [f if f != UNREACHABLE else b for f, b in zip(self.field, fallback)]
+
+    # This function updates the cached field with the walls that changed
+    # Return False if the field has to be computed again
+    def __repair(self, walls):
+        field = self.field
+        neighbours = Grid.neighbour_table(self.size)
+        added = []
+        removed = []
+        for cell in range(len(walls)):
+            if walls[cell] != self.walls[cell]:
+                (added if walls[cell] else removed).append(cell)
+
+        # A new wall on the wavefront changes the distance of the cells that only reach the food through it
+        lost = [(cell, field[cell]) for cell in added if field[cell] != UNREACHABLE]
+        for cell, d in lost:
+            field[cell] = UNREACHABLE
+        for cell, d in lost:
+            for move, n in neighbours[cell]:
+                if field[n] == d + 1 and not any(field[m] == d for i, m in neighbours[n]):
+                    return False
+
+        # A cell that is no longer a wall is given a distance from its neighbours
+        frontier = deque()
+        for cell in removed:
+            best = UNREACHABLE
+            for move, n in neighbours[cell]:
+                if field[n] != UNREACHABLE and (best == UNREACHABLE or field[n] + 1 < best):
+                    best = field[n] + 1
+            field[cell] = best
+            if best != UNREACHABLE:
+                frontier.append(cell)
+
+        # The shortcuts are spread to the cells behind them, a distance is only ever lowered
+        while frontier:
+            cell = frontier.popleft()
+            d = field[cell] + 1
+            for move, n in neighbours[cell]:
+                if not walls[n] and (field[n] == UNREACHABLE or field[n] > d):
+                    field[n] = d
+                    frontier.append(n)
+
+        return True
+
+    def __compute(self, goal, walls):
+        if np is None:
+            return self.__compute_bfs(goal, walls)
+        return self.__compute_numpy(goal, walls)
+
+    # Expand the whole wavefront one step at a time with array shifts
+    def __compute_numpy(self, goal, walls):
+        size = self.size
+        free = np.frombuffer(bytes(walls), dtype=np.uint8).reshape(size, size) == 0
+        dist = np.full((size, size), UNREACHABLE, dtype=np.int32)
+        goal_x, goal_y = Grid.decode(goal, size)
+        front = np.zeros((size, size), dtype=bool)
+        front[goal_y, goal_x] = True
+        dist[goal_y, goal_x] = 0
+        visited = front.copy()
+
+        d = 0
+        while front.any():
+            d += 1
+            grown = np.zeros_like(front)
+            grown[1:, :] |= front[:-1, :]
+            grown[:-1, :] |= front[1:, :]
+            grown[:, 1:] |= front[:, :-1]
+            grown[:, :-1] |= front[:, 1:]
+            front = grown & free & ~visited
+            visited |= front
+            dist[front] = d
+
+        return dist.ravel().tolist()
+
+    def __compute_bfs(self, goal, walls):
+        neighbours = Grid.neighbour_table(self.size)
+        dist = [UNREACHABLE] * (self.size * self.size)
+        dist[goal] = 0
+        frontier = deque([goal])
+        while frontier:
+            cell = frontier.popleft()
+            d = dist[cell] + 1
+            for move, n in neighbours[cell]:
+                if dist[n] == UNREACHABLE and not walls[n]:
+                    dist[n] = d
+                    frontier.append(n)
+        return dist
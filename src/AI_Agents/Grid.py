@@ -0,0 +1,61 @@
+"""
+Integer encoding of the board used by the planners
+    -   A cell (x, y) is encoded as y * size + x
+    -   A move is encoded as 0 = UP, 1 = DOWN, 2 = RIGHT, 3 = LEFT (same order as the Direction values)
+    -   The tables are built once per board size and cached, expanding a cell is only indexing
+
+Tuples and Direction values should only be converted at the boundary of a planner
+"""
+import functools
+
+from Direction import Direction
+
+MOVES = (Direction.UP, Direction.DOWN, Direction.RIGHT, Direction.LEFT)
+MOVE_OF = {d: i for i, d in enumerate(MOVES)}
+OPPOSITE = (1, 0, 3, 2)
+OFFSETS = ((0, -1), (0, 1), (1, 0), (-1, 0))
+
+
+def encode(pos, size):
+    return int(pos[1]) * size + int(pos[0])
+
+
+def decode(cell, size):
+    return cell % size, cell // size
+
+
+# This function returns a tuple indexed by cell
+# Each entry is a tuple of (move, neighbour cell) for every move that stays on the board
+@functools.lru_cache(maxsize=None)
+def neighbour_table(size):
+    table = []
+    for cell in range(size * size):
+        x, y = decode(cell, size)
+        neighbours = []
+        for move, (dx, dy) in enumerate(OFFSETS):
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < size and 0 <= ny < size:
+                neighbours.append((move, ny * size + nx))
+        table.append(tuple(neighbours))
+    return tuple(table)
+
+
+# This function returns a tuple indexed by cell then by the last move
+# Each entry is the neighbours of the cell without the one going back (i.e., the opposite of the last move)
+@functools.lru_cache(maxsize=None)
+def successor_table(size):
+    table = []
+    for neighbours in neighbour_table(size):
+        table.append(tuple(tuple(n for n in neighbours if n[0] != OPPOSITE[last]) for last in range(len(MOVES))))
+    return tuple(table)
+
+
+# This function returns the Manhattan distance from every cell to the goal cell
+def manhattan_table(size, goal):
+    goal_x, goal_y = decode(goal, size)
+    row = [abs(x - goal_x) for x in range(size)]
+    table = []
+    for y in range(size):
+        dy = abs(y - goal_y)
+        table.extend([dx + dy for dx in row])
+    return table
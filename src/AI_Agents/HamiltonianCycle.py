@@ -0,0 +1,98 @@
+"""
+This class is an AI agent following a Hamiltonian cycle of the board
+Characteristics:
+    -   The cycle visits every cell once, following it never collides, so the snake always wins
+    -   The cycle is precomputed once per board size and cached, picking a move is O(1)
+    -   Optionally takes shortcuts towards the food when they provably do not trap the tail:
+        0.  A shortcut only jumps forward along the cycle, never past the tail (with a buffer for growing)
+            so the whole body always stays between the tail and the head in cycle order
+        1.  A shortcut never jumps past the food
+        2.  No shortcut once the snake fills half of the board
+    -   The board size has to be even, an odd board has no Hamiltonian cycle
+
+Representation of the cycle:
+    -   Row 0 from left to right, then the rows below zigzag over the columns 1 to N-1, then up along column 0
+    -   cycle[i] is the i-th cell of the cycle, order[cell] is the index of the cell in the cycle
+
+Methods:
+    Public:
+        -   find_path(beginning_pos, goal_pos, direction, snake_whole_body, snake_length) --> Return the next move
+"""
+import functools
+
+from AI_Agents import Grid
+from AI_Agents.Agent import Agent
+from Direction import Direction
+
+
+# This function returns (cycle, order) of the board
+@functools.lru_cache(maxsize=None)
+def hamiltonian_cycle(size):
+    if size % 2 != 0 or size < 2:
+        raise ValueError(f'A {size}x{size} board has no Hamiltonian cycle')
+
+    cycle = [x for x in range(size)]
+    for y in range(1, size):
+        xs = range(size - 1, 0, -1) if y % 2 == 1 else range(1, size)
+        cycle.extend(y * size + x for x in xs)
+    cycle.extend(y * size for y in range(size - 1, 0, -1))
+
+    order = [0] * (size * size)
+    for i, cell in enumerate(cycle):
+        order[cell] = i
+    return tuple(cycle), tuple(order)
+
+
+class HamiltonianCycle(Agent):
+    incremental = True
+
+    # Number of extra cells kept between the head and the tail when taking a shortcut
+    shortcut_buffer = 4
+
+    def __init__(self, borderSize, shortcuts=True):
+        self.borderSize = borderSize
+        self.shortcuts = shortcuts
+        self.cycle, self.order = hamiltonian_cycle(borderSize)
+        self.neighbours = Grid.neighbour_table(borderSize)
+
+    # This function returns the next move as a list of one direction
+    # Return an empty list if there is no safe move
+    def find_path(self, beginning_pos, goal_pos, direction: Direction, snake_whole_body, snake_length):
+        size = self.borderSize
+        cells = size * size
+        order = self.order
+        head = Grid.encode(beginning_pos, size)
+        tail = Grid.encode(snake_whole_body[0], size)
+        food = Grid.encode(goal_pos, size) if goal_pos is not None else None
+        reverse = Grid.OPPOSITE[Grid.MOVE_OF[direction]]
+
+        head_order = order[head]
+        to_tail = (order[tail] - head_order) % cells
+        to_food = (order[food] - head_order) % cells if food is not None else cells
+
+        best_move = None
+        best_distance = 0
+        for move, n in self.neighbours[head]:
+            if move == reverse:
+                continue
+            distance = (order[n] - head_order) % cells
+
+            # The next cell of the cycle is always safe
+            if distance == 1 and best_move is None:
+                best_move, best_distance = move, distance
+            if not self.shortcuts or snake_length * 2 > cells:
+                continue
+
+            # A shortcut has to stay in front of the tail and must not pass the food
+            if distance < to_tail - self.shortcut_buffer and distance <= to_food and distance > best_distance:
+                best_move, best_distance = move, distance
+
+        # The next cell of the cycle may be behind the snake while it is too short to be on the cycle
+        if best_move is None:
+            body = {Grid.encode(pos, size) for pos in snake_whole_body[1:]}
+            for move, n in self.neighbours[head]:
+                if move != reverse and n not in body:
+                    best_move = move
+                    break
+
+        return [Grid.MOVES[best_move]] if best_move is not None else []
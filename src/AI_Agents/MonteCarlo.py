@@ -0,0 +1,197 @@
+"""
+This class is an AI agent evaluating every move with Monte Carlo rollouts
+Characteristics:
+    -   Two engines to run the rollouts:
+        0.  engine='snapshot': the state of the game is loaded into a private Snake, every rollout plays on it
+            after a snapshot and is undone with restore, so no snake is copied
+        1.  engine='batch': the state is loaded into every game of a BatchGame and all the rollouts of a tick
+            are stepped in lockstep with NumPy (the same rollout policy, vectorized)
+    -   A rollout makes the move, then follows the rollout policy for up to depth moves:
+        0.  Mostly towards the food by Manhattan distance, with probability epsilon a random safe move
+        1.  A new food is drawn from the free cells once the food is eaten
+    -   The value of a rollout is the number of moves survived + food_reward per food eaten,
+        a rollout that fills the board survives the whole depth
+    -   The budget is the number of rollouts per tick, split evenly over the moves that do not collide right away,
+        every such move gets one rollout at least
+    -   An unknown engine raises a ValueError
+    -   The move with the best average value is taken
+
+Methods:
+    Public:
+        -   find_path(beginning_pos, goal_pos, direction, snake_whole_body, snake_length) --> Return the next move
+        -   rollouts_per_second()
+        -   stats() --> See Agent
+"""
+import random
+import time
+
+import Snake
+from AI_Agents import Grid
+from AI_Agents.Agent import Agent
+from Direction import Direction
+
+
+class MonteCarlo(Agent):
+    incremental = True
+
+    def __init__(self, borderSize, rollouts=64, depth=None, epsilon=0.2, food_reward=None, seed=None,
+                 engine='snapshot'):
+        if engine not in ('snapshot', 'batch'):
+            raise ValueError(f'Unknown engine {engine}')
+        self.borderSize = borderSize
+        self.engine = engine
+        self.budget = rollouts
+        self.depth = depth if depth is not None else 2 * borderSize
+        self.epsilon = epsilon
+        self.food_reward = food_reward if food_reward is not None else self.depth
+        self.random = random.Random(seed)
+        self.neighbours = Grid.neighbour_table(borderSize)
+        self.simulation = Snake.Snake(borderSize)
+
+        # BatchGame pulls in numpy, it is only imported when it is used
+        # It has a row for every move at least, so every move gets a rollout however small the budget is
+        self.batch = None
+        if engine == 'batch':
+            from BatchGame import BatchGame
+            self.batch = BatchGame(borderSize, max(rollouts, len(Grid.MOVES)), seed=seed)
+
+        self.rollouts = 0       # Number of rollouts played so far
+        self.elapsed = 0.0      # Time spent in find_path so far (seconds)
+
+    # This function returns the next move as a list of one direction
+    # Return an empty list if every move collides right away
+    def find_path(self, beginning_pos, goal_pos, direction: Direction, snake_whole_body, snake_length):
+        start = time.perf_counter()
+        size = self.borderSize
+        simulation = self.simulation
+        simulation.load(snake_whole_body, direction)
+        head = Grid.encode(beginning_pos, size)
+        food = Grid.encode(goal_pos, size) if goal_pos is not None else None
+
+        moves = self.__safe_moves(head, Grid.MOVE_OF[direction])
+        if not moves:
+            self.elapsed += time.perf_counter() - start
+            return []
+
+        if self.batch is not None:
+            best_move = self.__best_move_batch(moves, snake_whole_body, direction, goal_pos)
+            self.elapsed += time.perf_counter() - start
+            return [Grid.MOVES[best_move]]
+
+        rollouts = max(1, self.budget // len(moves))
+        best_move = None
+        best_value = None
+        for move in moves:
+            total = 0
+            for i in range(rollouts):
+                mark = simulation.snapshot()
+                total += self.__rollout(move, food)
+                simulation.restore(mark)
+            self.rollouts += rollouts
+            if best_value is None or total > best_value:
+                best_move, best_value = move, total
+        simulation.commit()
+
+        self.elapsed += time.perf_counter() - start
+        return [Grid.MOVES[best_move]]
+
+    def rollouts_per_second(self):
+        return self.rollouts / self.elapsed if self.elapsed > 0 else 0.0
+
+    def stats(self):
+        return {'rollouts': self.rollouts, 'rollouts_per_second': self.rollouts_per_second()}
+
+    # This function plays one rollout on the simulation, starting with move
+    def __rollout(self, move, food):
+        simulation = self.simulation
+        size = self.borderSize
+        value = 0
+        for step in range(self.depth):
+            simulation.changeDirection(Grid.MOVES[move])
+            ate = simulation.move(Grid.decode(food, size) if food is not None else (-1, -1))
+
+            # The policy only takes safe moves, so a collision means there was no safe move left
+            if simulation.isBitten():
+                return value
+            value += 1
+
+            if ate:
+                value += self.food_reward
+                count = simulation.getFreeCount()
+                if count == 0:
+                    return value + self.depth - step - 1
+                food = self.__cell(simulation.getFreeCell(self.random.randrange(count)))
+
+            head = self.__cell(simulation.getHead())
+            moves = self.__safe_moves(head, move)
+            if not moves:
+                return value
+            if self.random.random() < self.epsilon:
+                move = self.random.choice(moves)
+            else:
+                move = self.__towards(moves, head, food)
+        return value
+
+    # This function plays the rollouts of every move at once on the BatchGame, returns the move with the best value
+    def __best_move_batch(self, moves, snake_whole_body, direction, goal_pos):
+        import numpy as np
+
+        batch = self.batch
+        rollouts = max(1, batch.count // len(moves))
+        rows = np.arange(rollouts * len(moves))
+        batch.load(rows, snake_whole_body, direction, goal_pos if goal_pos is not None else (-1, -1))
+
+        # The first move of a rollout is the move it evaluates, the games after the last group are not used
+        first = np.zeros(batch.count, dtype=np.int64)
+        first[rows] = np.repeat(moves, rollouts)
+        active = np.zeros(batch.count, dtype=bool)
+        active[rows] = True
+
+        value = np.zeros(batch.count, dtype=np.int64)
+        step_moves = first
+        for step in range(self.depth):
+            ate, done, win, score = batch.step(step_moves)
+            value += active & ~(done & ~win)
+            value += self.food_reward * (active & ate)
+            value += (self.depth - step - 1) * (active & win)
+            active &= ~done
+            if not active.any():
+                break
+            step_moves = batch.greedy(self.epsilon)
+
+        self.rollouts += len(rows)
+        totals = value[rows].reshape(len(moves), rollouts).sum(axis=1)
+        return moves[int(np.argmax(totals))]
+
+    # This function returns the moves from head that stay on the board and do not run into the body
+    # The tail moves out of the way (the food is never on the tail, so the snake does not grow on that move)
+    def __safe_moves(self, head, last):
+        simulation = self.simulation
+        tail = simulation.getTailCell()
+        reverse = Grid.OPPOSITE[last]
+        moves = []
+        for move, n in self.neighbours[head]:
+            if move == reverse:
+                continue
+            if simulation.isOccupiedCell(n) and n != tail:
+                continue
+            moves.append(move)
+        return moves
+
+    # This function returns the move of moves closest to the food (the first one if there is no food)
+    def __towards(self, moves, head, food):
+        if food is None:
+            return moves[0]
+        size = self.borderSize
+        food_x, food_y = Grid.decode(food, size)
+        best = None
+        for move in moves:
+            dx, dy = Grid.OFFSETS[move]
+            x, y = Grid.decode(head, size)
+            distance = abs(x + dx - food_x) + abs(y + dy - food_y)
+            if best is None or distance < best[0]:
+                best = (distance, move)
+        return best[1]
+
+    def __cell(self, pos):
+        return Grid.encode(pos, self.borderSize)
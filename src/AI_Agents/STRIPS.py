@@ -0,0 +1,165 @@
+"""
+This class is an AI agent planning in a STRIPS model of the snake domain
+Characteristics:
+    -   Facts:
+        0.  at(c)   --> the head is on cell c, bit c of the state
+        1.  occupied(c) --> cell c is taken by the snake, bit N^2 + c of the state
+    -   A state is a frozen set of facts stored as a single int (a bitset), hashed as it is in the closed set
+    -   Operators move(c, m) for every cell c and move m staying on the board:
+        -   Preconditions:  at(c), not occupied(c + m)
+        -   Add effects:    at(c + m), occupied(c + m)
+        -   Delete effects: at(c)
+        The preconditions and effects of every operator are precomputed as masks once per board size,
+        so checking an operator is (state & pre == pre and state & forbidden == 0), applying it is
+        ((state & ~delete) | add)
+    -   The body moves on by itself: before the step k the segment k - 1 (from the tail) is vacated, a delete
+        effect of the clock that every operator of the step shares
+    -   The cells the head has passed stay occupied for the rest of the plan, the plan never crosses itself
+        (the model is conservative, a plan it finds is always valid)
+    -   Best-first search on f = steps + Manhattan distance from the head to the goal, with a heap queue
+    -   The move back into the neck is never taken (Snake.changeDirection ignores it)
+    -   Closed set of (state, step) with the step capped at the snake length (once the whole old body has vacated
+        the step makes no difference)
+    -   States that only differ by the trail multiply quickly on a detour, so only the first width states of a
+        (head, step) are expanded (width=1 by default); the search may miss a plan, but a plan it returns is still
+        checked against the exact state: it is replayed on a Snake loaded with the body, and dropped unless every
+        move is taken, stays on the board, does not bite the body and the food is eaten on the last move
+
+Methods:
+    Public:
+        -   find_path(beginning_pos, goal_pos, direction, snake_whole_body, snake_length) --> Return the plan
+        -   stats() --> See Agent
+    Usage:
+        Game.Game(size, ai=STRIPS(size)) in place of AStar
+"""
+import functools
+import heapq
+
+import Snake
+from AI_Agents import Grid
+from AI_Agents.Agent import Agent
+from Direction import Direction
+
+
+# This function returns the operators of the board, indexed by cell then by move
+# An operator is (pre, forbidden, delete, add, neighbour cell), None if the move leaves the board
+@functools.lru_cache(maxsize=None)
+def operators(size):
+    cells = size * size
+    table = []
+    for cell, neighbours in enumerate(Grid.neighbour_table(size)):
+        ops = [None] * len(Grid.MOVES)
+        for move, n in neighbours:
+            at_cell = 1 << cell
+            ops[move] = (at_cell, 1 << (cells + n), at_cell, (1 << n) | (1 << (cells + n)), n)
+        table.append(tuple(ops))
+    return tuple(table)
+
+
+class STRIPS(Agent):
+    def __init__(self, borderSize, width=1):
+        self.borderSize = borderSize
+        self.width = width
+        self.operators = operators(borderSize)
+        self.simulation = Snake.Snake(borderSize)     # Replays the plans
+        self.expansions = 0
+        self.invalid_plans = 0  # Number of plans dropped by the replay
+
+    # This function finds a plan from the state of the game to a state where at(goal) holds
+    # Return a list of directions
+    # Return an empty list if no plan found
+    def find_path(self, beginning_pos, goal_pos, direction: Direction, snake_whole_body, snake_length):
+        size = self.borderSize
+        cells = size * size
+        beginning = Grid.encode(beginning_pos, size)
+        goal = Grid.encode(goal_pos, size)
+        body = [Grid.encode(pos, size) for pos in snake_whole_body]
+        length = len(body)
+        operators = self.operators
+        h = Grid.manhattan_table(size, goal)
+
+        # Initial state, and the clock effect of each step (the segment vacated before it)
+        state = 1 << beginning
+        for cell in body:
+            state |= 1 << (cells + cell)
+        vacate = [~(1 << (cells + cell)) for cell in body]
+
+        # A node is (f, h, count, state, step, head, index in the parent table)
+        # The parent table keeps (parent index, move) to rebuild the plan
+        parents = [(None, None)]
+        frontier = [(h[beginning], h[beginning], 0, state, 0, beginning, 0)]
+        closed = set()
+        expanded = {}
+        width = self.width
+        last = Grid.MOVE_OF[direction]
+        count = 0
+        self.expansions = 0
+
+        while frontier:
+            f, _, _, state, step, head, index = heapq.heappop(frontier)
+            if head == goal:
+                plan = self.__plan(parents, index)
+                if not self.__isValid(plan, goal_pos, direction, snake_whole_body):
+                    self.invalid_plans += 1
+                    return []
+                return plan
+
+            key = (state, min(step, length))
+            if key in closed:
+                continue
+            closed.add(key)
+
+            # Only the first width states of a (head, step) are expanded, the others only differ by the trail
+            projection = (head, key[1])
+            seen = expanded.get(projection, 0)
+            if seen == width:
+                continue
+            expanded[projection] = seen + 1
+            self.expansions += 1
+
+            # The clock of the next step
+            if step < length:
+                state &= vacate[step]
+
+            # A snake cannot turn back into its neck (Snake.changeDirection), even once the neck has vacated
+            reverse = Grid.OPPOSITE[parents[index][1] if index else last]
+            for move, op in enumerate(operators[head]):
+                if op is None or move == reverse:
+                    continue
+                pre, forbidden, delete, add, n = op
+                if state & pre != pre or state & forbidden:
+                    continue
+                child = (state & ~delete) | add
+                parents.append((index, move))
+                count += 1
+                heapq.heappush(frontier, (step + 1 + h[n], h[n], -count, child, step + 1, n, len(parents) - 1))
+
+        return []
+
+    def stats(self):
+        return {'expansions': self.expansions, 'invalid_plans': self.invalid_plans}
+
+    def __plan(self, parents, index):
+        moves = []
+        while parents[index][0] is not None:
+            index, move = parents[index]
+            moves.append(Grid.MOVES[move])
+        moves.reverse()
+        return moves
+
+    # This function plays the plan on the exact state of the game
+    # Return True iff every move is taken, stays on the board and does not bite the body,
+    # and the food is eaten on the last move only
+    def __isValid(self, plan, goal_pos, direction, snake_whole_body):
+        size = self.borderSize
+        simulation = self.simulation
+        simulation.load(snake_whole_body, direction)
+        for i, direction in enumerate(plan):
+            simulation.changeDirection(direction)
+            if simulation.getDirection() is not direction:
+                return False
+            ate = simulation.move(goal_pos)
+            x, y = simulation.getHead()
+            if not (0 <= x < size and 0 <= y < size) or simulation.isBitten() or ate != (i == len(plan) - 1):
+                return False
+        return True
@@ -0,0 +1,195 @@
+import numpy as np
+
+import Game
+from AI_Agents import Grid
+from Direction import Direction
+
+
+class BatchGame:
+    """
+    This class runs many games of the same board size in lockstep
+    Every game follows the rules of Snake and Game, but the state of all the games is kept in NumPy arrays
+    and each step advances all of them with vectorized operations
+    This class provides methods to:
+        step all the games with one move each
+        pick a greedy move for every game
+        load the state of a game into some of the games (e.g., to start rollouts)
+        restart the games that ended (automatically, in the same step)
+
+    State (one row per game, a cell is y * size + x and a move is an index of Grid.MOVES):
+        -   ring, headIdx, tailIdx, length  --> Cyclic array of the snake cells, as in Snake
+        -   stamp, epoch    --> A cell is occupied iff its stamp is the epoch of the game, so a restart is O(1)
+        -   head, direction, food, score
+        -   Cells are read and written through flat indices (row * cells + cell), one per game
+        -   Only the games that ate look for a free cell, the new food is drawn from the occupancy of those rows
+    """
+
+    def __init__(self, size, count, seed=None):
+        self.size = size
+        self.count = count
+        self.cells = size * size
+        self.rng = np.random.default_rng(seed)
+        self.rows = np.arange(count)
+        self.base = self.rows * self.cells
+
+        # The neighbour of every cell by move, -1 if the move leaves the board
+        self.neighbours = np.full((self.cells, len(Grid.MOVES)), -1, dtype=np.int64)
+        for cell, neighbours in enumerate(Grid.neighbour_table(size)):
+            for move, n in neighbours:
+                self.neighbours[cell, move] = n
+        self.opposite = np.array(Grid.OPPOSITE, dtype=np.int64)
+        self.x = np.arange(self.cells) % size
+        self.y = np.arange(self.cells) // size
+        self.middle = (size // 2) * size + size // 2
+
+        self.ring = np.zeros((count, self.cells), dtype=np.int64)
+        self.headIdx = np.zeros(count, dtype=np.int64)
+        self.tailIdx = np.zeros(count, dtype=np.int64)
+        self.length = np.zeros(count, dtype=np.int64)
+        self.stamp = np.zeros((count, self.cells), dtype=np.int32)
+        self.epoch = np.zeros(count, dtype=np.int32)
+        self.head = np.zeros(count, dtype=np.int64)
+        self.direction = np.zeros(count, dtype=np.int64)
+        self.food = np.zeros(count, dtype=np.int64)
+        self.score = np.zeros(count, dtype=np.int64)
+
+        # Flat views of the per cell arrays
+        self.ringFlat = self.ring.reshape(-1)
+        self.stampFlat = self.stamp.reshape(-1)
+
+        self.__reset(self.rows)
+
+    # This function moves every game by one move
+    # moves is an array of move indices (Grid.MOVES), a move back into the neck is ignored as in Snake.changeDirection
+    # Returns (ate, done, win, score), score is the final score for the games that ended in this step
+    # The games that ended are restarted before returning
+    def step(self, moves):
+        moves = np.asarray(moves, dtype=np.int64)
+        base = self.base
+        cells = self.cells
+
+        # Change direction
+        self.direction = np.where(moves == self.opposite[self.direction], self.direction, moves)
+
+        # Move the head
+        cell = self.neighbours[self.head, self.direction]
+        out = cell < 0
+        cell[out] = 0
+        ate = ~out & (cell == self.food)
+
+        # Remove tail if food is not eaten, the tail is removed first so that the head can enter the cell it left
+        grow = ate
+        tail = self.ringFlat[base + self.tailIdx]
+        self.stampFlat[base + tail] = np.where(grow, self.epoch, 0)
+        self.tailIdx += ~grow
+        self.tailIdx[self.tailIdx == cells] = 0
+
+        # Check if the snake collide with its body or the wall after moving
+        dead = out | (self.stampFlat[base + cell] == self.epoch)
+        alive = ~dead
+
+        # Add head, a game that died keeps its last head (it is restarted below)
+        self.headIdx += alive
+        self.headIdx[self.headIdx == cells] = 0
+        self.head = np.where(alive, cell, self.head)
+        self.ringFlat[base + self.headIdx] = self.head
+        self.stampFlat[base + self.head] = self.epoch
+        self.length += ate
+
+        # Calculate score
+        ate &= alive
+        self.score = np.where(ate, self.score + Game.Game.scoreIncrement,
+                              np.maximum(self.score - Game.Game.scoreDecrement, 0))
+
+        # The snake fills the whole board
+        win = alive & (self.length == cells)
+
+        # Generate food where it was eaten
+        self.__generateFood(np.flatnonzero(ate & ~win))
+
+        done = dead | win
+        score = self.score.copy()
+        self.__reset(np.flatnonzero(done))
+        return ate, done, win, score
+
+    # This function returns the move towards the food that does not collide right away for every game
+    # (Manhattan distance, ties go to the Grid.MOVES order), a game with no safe move keeps its direction
+    # With probability epsilon a game takes a random safe move instead
+    def greedy(self, epsilon=0.0):
+        cell = self.neighbours[self.head]
+        out = cell < 0
+        cell = np.where(out, 0, cell)
+
+        # The tail moves out of the way, so the head can follow it
+        tail = self.ringFlat[self.base + self.tailIdx]
+        occupied = (self.stampFlat[self.base[:, None] + cell] == self.epoch[:, None]) & (cell != tail[:, None])
+        safe = ~out & ~occupied
+        safe[self.rows, self.opposite[self.direction]] = False
+
+        distance = np.abs(self.x[cell] - self.x[self.food][:, None]) + np.abs(self.y[cell] - self.y[self.food][:, None])
+        if epsilon > 0:
+            explore = self.rng.random(self.count) < epsilon
+            distance[explore] = self.rng.integers(0, 4, (int(explore.sum()), len(Grid.MOVES)))
+        distance[~safe] = 4 * self.size
+        moves = np.argmin(distance, axis=1)
+        return np.where(safe.any(axis=1), moves, self.direction)
+
+    # This function places the same snake (positions tail first, head last), direction and food on the games of rows
+    # Used to start rollouts from the state of a game (e.g., MonteCarlo)
+    def load(self, rows, wholeSnake, direction, foodPos):
+        cells = np.array([int(y) * self.size + int(x) for x, y in wholeSnake], dtype=np.int64)
+        self.epoch[rows] += 1
+        self.ring[np.ix_(rows, np.arange(len(cells)))] = cells
+        self.stamp[np.ix_(rows, cells)] = self.epoch[rows, None]
+        self.headIdx[rows] = len(cells) - 1
+        self.tailIdx[rows] = 0
+        self.length[rows] = len(cells)
+        self.head[rows] = cells[-1]
+        self.direction[rows] = Grid.MOVE_OF[direction]
+        self.food[rows] = int(foodPos[1]) * self.size + int(foodPos[0])
+        self.score[rows] = 0
+
+    # This function returns the whole snake of one game as a list of (x, y), tail first
+    def getWholeSnake(self, game):
+        cells = [self.ring[game, (self.tailIdx[game] + i) % self.cells] for i in range(self.length[game])]
+        return [(int(c) % self.size, int(c) // self.size) for c in cells]
+
+    def getFoodPos(self, game):
+        return int(self.food[game]) % self.size, int(self.food[game]) // self.size
+
+    def getDirection(self, game):
+        return Grid.MOVES[self.direction[game]]
+
+    # This function restarts the games of rows, the snake starts in the middle going left as in Snake.reset
+    def __reset(self, rows):
+        if len(rows) == 0:
+            return
+        self.epoch[rows] += 1
+        self.headIdx[rows] = 0
+        self.tailIdx[rows] = 0
+        self.length[rows] = 1
+        self.ring[rows, 0] = self.middle
+        self.head[rows] = self.middle
+        self.stamp[rows, self.middle] = self.epoch[rows]
+        self.direction[rows] = Grid.MOVE_OF[Direction.LEFT]
+        self.score[rows] = 0
+        self.__generateFood(rows)
+
+    # The food is drawn among the free cells of each game of rows
+    # A few random cells are tried first, only the games that missed every time (i.e., a nearly full board)
+    # count their free cells and take the k-th one for a random k, either way every free cell is equally likely
+    # A game with no free cell has already ended
+    def __generateFood(self, rows, attempts=4):
+        for i in range(attempts):
+            if len(rows) == 0:
+                return
+            cell = self.rng.integers(0, self.cells, len(rows))
+            free = self.stampFlat[self.base[rows] + cell] != self.epoch[rows]
+            self.food[rows[free]] = cell[free]
+            rows = rows[~free]
+
+        if len(rows) == 0:
+            return
+        free = self.stamp[rows] != self.epoch[rows, None]
+        k = (self.rng.random(len(rows)) * (self.cells - self.length[rows])).astype(np.int64)
+        self.food[rows] = np.argmax(np.cumsum(free, axis=1) > k[:, None], axis=1)
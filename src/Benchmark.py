@@ -0,0 +1,611 @@
+"""
+Benchmarks for the AI agents and the game logic
+Usage:
+    python Benchmark.py [name ...]
+
+Every benchmark runs on the same fixed boards, so the numbers are comparable between runs
+"""
+import contextlib
+import io
+import sys
+import time
+
+import Bitboard
+from AI_Agents import Agent, Grid
+from AI_Agents.AnytimeAStar import AnytimeAStar
+from AI_Agents.AStar import AStar
+from AI_Agents.BackgroundPlanner import BackgroundPlanner
+from AI_Agents.DStarLite import DStarLite
+from AI_Agents.HamiltonianCycle import HamiltonianCycle
+from AI_Agents.MonteCarlo import MonteCarlo
+from AI_Agents.STRIPS import STRIPS
+from Direction import Direction
+
+
+# This function builds a snake that zigzags along the rows from the top left corner
+# Return the whole snake (tail first, head last) and the direction of the head
+def serpentine_body(size, length):
+    body = []
+    for y in range(size):
+        xs = range(size) if y % 2 == 0 else range(size - 1, -1, -1)
+        for x in xs:
+            if len(body) == length:
+                break
+            body.append((x, y))
+
+    x, y = body[-1]
+    if len(body) > 1 and body[-2][1] != y:
+        direction = Direction.DOWN
+    else:
+        direction = Direction.RIGHT if y % 2 == 0 else Direction.LEFT
+    return body, direction
+
+
+# This function builds a snake that stands as a wall in the middle column, tail at the bottom
+# The head turns back next to the top of the wall, so the food on the other side is close but hard to reach
+def wall_body(size):
+    c = size // 2
+    body = [(c, y) for y in range(size - 2, -1, -1)]
+    body.extend([(c - 1, 0), (c - 1, 1)])
+    return body, Direction.DOWN
+
+
+# A board is (name, size, whole snake body, head direction, food position)
+def boards():
+    result = []
+    for size, ratio in ((10, 0.3), (20, 0.2), (20, 0.5), (30, 0.3), (40, 0.3), (60, 0.2)):
+        length = int(size * size * ratio)
+        body, direction = serpentine_body(size, length)
+        result.append((f'{size}x{size} length {length}', size, body, direction, (size - 1, size - 1)))
+    for size in (20, 40, 60):
+        body, direction = wall_body(size)
+        result.append((f'{size}x{size} wall', size, body, direction, (size // 2 + 1, 1)))
+    return result
+
+
+def astar_kernels(repeat=5):
+    print('A* expansions per second')
+    for name, size, body, direction, food in boards():
+        for threaded in (False, True):
+            ai = AStar(size, threaded=threaded)
+            expansions = 0
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                for i in range(repeat):
+                    ai.find_path(body[-1], food, direction, body, len(body))
+                    expansions += ai.expansions
+            elapsed = time.perf_counter() - start
+            kernel = 'threaded' if threaded else 'heap'
+            print(f'    {name:<20} {kernel:<10} {expansions / elapsed:>12.0f} expansions/s'
+                  f'  {elapsed / repeat * 1000:>9.2f} ms/search')
+
+
+def astar_frontiers(repeat=5):
+    print('A* frontier overhead')
+    for name, size, body, direction, food in boards():
+        for frontier in ('heap', 'bucket'):
+            ai = AStar(size, frontier=frontier)
+            expansions = 0
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                for i in range(repeat):
+                    ai.find_path(body[-1], food, direction, body, len(body))
+                    expansions += ai.expansions
+            elapsed = time.perf_counter() - start
+            print(f'    {name:<20} {frontier:<10} {elapsed / expansions * 1e6:>9.3f} us/expansion'
+                  f'  {elapsed / repeat * 1000:>9.2f} ms/search')
+
+
+def astar_heuristics(repeat=5):
+    print('A* heuristics')
+    for name, size, body, direction, food in boards():
+        for heuristic in ('manhattan', 'distance_field'):
+            ai = AStar(size, frontier='bucket', heuristic=heuristic)
+            expansions = 0
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                for i in range(repeat):
+                    ai.find_path(body[-1], food, direction, body, len(body))
+                    expansions += ai.expansions
+            elapsed = time.perf_counter() - start
+            print(f'    {name:<20} {heuristic:<15} {expansions // repeat:>8} expansions'
+                  f'  {elapsed / repeat * 1000:>9.2f} ms/search')
+
+
+# This function moves the snake by one step in the direction
+def step(body, direction, food):
+    x, y = body[-1]
+    if direction == Direction.UP:
+        y -= 1
+    elif direction == Direction.DOWN:
+        y += 1
+    elif direction == Direction.RIGHT:
+        x += 1
+    else:
+        x -= 1
+    return body[1:] + [(x, y)] if (x, y) != food else body + [(x, y)]
+
+
+# This function replans on every tick until the food is eaten, following the first move of every plan
+# Return the number of ticks and the latency of every call in microseconds
+# The agents print while they plan, the output is dropped so that the terminal is not timed
+def replan_until_eaten(ai, body, direction, food, max_ticks=200):
+    snake = body
+    d = direction
+    latencies = []
+    while snake[-1] != food and len(latencies) < max_ticks:
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter_ns()
+            path = ai.find_path(snake[-1], food, d, snake, len(snake))
+            latencies.append((time.perf_counter_ns() - start) / 1000)
+        if not path:
+            break
+        d = path[0]
+        snake = step(snake, d, food)
+    return len(latencies), latencies
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def replanning():
+    print('Replanning on every tick until the food is eaten')
+    for name, size, body, direction, food in boards():
+        for ai in (AStar(size, frontier='bucket'), DStarLite(size)):
+            ticks, latencies = replan_until_eaten(ai, body, direction, food)
+            print(f'    {name:<20} {type(ai).__name__:<10} {ticks:>5} ticks  {sum(latencies) / ticks / 1000:>9.3f} ms/tick')
+
+
+def latency():
+    print('find_path latency percentiles in microseconds')
+    for name, size, body, direction, food in boards():
+        # The tables of a board size are built once, outside of the measured calls
+        Grid.successor_table(size)
+        agents = [('AStar', AStar(size, frontier='bucket'))]
+        for budget in (100, 500, 2000):
+            agents.append((f'Anytime {budget}us', AnytimeAStar(size, time_budget_us=budget)))
+        for label, ai in agents:
+            ticks, latencies = replan_until_eaten(ai, body, direction, food)
+            print(f'    {name:<20} {label:<15} {ticks:>5} ticks'
+                  f'  p50 {percentile(latencies, 50):>9.0f}  p95 {percentile(latencies, 95):>9.0f}'
+                  f'  p99 {percentile(latencies, 99):>9.0f}  max {max(latencies):>9.0f}')
+
+
+def safety(repeat=20):
+    print('A* with and without the tail reachability check (the work after a rejection is bounded)')
+    for name, size, body, direction, food in boards():
+        elapsed = {}
+        for safety_check in (False, True):
+            ai = AStar(size, frontier='bucket', safety_check=safety_check)
+            with contextlib.redirect_stdout(io.StringIO()):
+                # The first search also builds the tables shared by every AStar of this size
+                ai.find_path(body[-1], food, direction, body, len(body))
+                start = time.perf_counter()
+                for i in range(repeat):
+                    ai.find_path(body[-1], food, direction, body, len(body))
+            elapsed[safety_check] = (time.perf_counter() - start) / repeat
+            label = 'checked' if safety_check else 'unchecked'
+            print(f'    {name:<20} {label:<10} {elapsed[safety_check] * 1000:>9.2f} ms/search'
+                  f'  {ai.expansions:>6} expanded  {ai.rejections:>3} rejected  {ai.chases:>2} chases')
+        print(f'    {name:<20} {"ratio":<10} {elapsed[True] / elapsed[False]:>9.2f} x')
+
+
+# Flood fill of the free cells from the head, one cell at a time
+def flood_fill_cells(size, body):
+    neighbours = Grid.neighbour_table(size)
+    occupied = bytearray(size * size)
+    for cell in body:
+        occupied[cell] = 1
+    visited = bytearray(size * size)
+    stack = [body[-1]]
+    reached = 0
+    while stack:
+        cell = stack.pop()
+        for move, n in neighbours[cell]:
+            if not visited[n] and not occupied[n]:
+                visited[n] = 1
+                reached += 1
+                stack.append(n)
+    return reached
+
+
+def bitboard(repeat=200):
+    print('Flood fill and collision checks, cell by cell and on a bitboard')
+    for name, size, body, direction, food in boards():
+        cells = [Grid.encode(pos, size) for pos in body]
+
+        start = time.perf_counter()
+        for i in range(repeat):
+            flood_fill_cells(size, cells)
+        per_cell = (time.perf_counter() - start) / repeat
+
+        start = time.perf_counter()
+        for i in range(repeat):
+            occupancy = Bitboard.from_cells(cells)
+            free = Bitboard.masks(size)[0] & ~occupancy
+            Bitboard.count(Bitboard.flood_fill(Bitboard.bit_of(cells[-1]), free, size) & free)
+        per_bitboard = (time.perf_counter() - start) / repeat
+
+        probes = [(x, y) for y in range(size) for x in range(size)]
+        start = time.perf_counter()
+        for pos in probes:
+            pos in body
+        per_list = (time.perf_counter() - start) / len(probes)
+
+        occupancy = Bitboard.from_cells(cells)
+        start = time.perf_counter()
+        for pos in probes:
+            occupancy & Bitboard.bit(pos, size) != 0
+        per_bit = (time.perf_counter() - start) / len(probes)
+
+        print(f'    {name:<20} flood fill {per_cell * 1e6:>9.1f} -> {per_bitboard * 1e6:>8.1f} us'
+              f'   collision {per_list * 1e6:>7.2f} -> {per_bit * 1e6:>5.2f} us')
+
+
+def hamiltonian(size=20, seed=0):
+    import Game
+
+    print('Hamiltonian cycle agent playing until the board is full')
+    for shortcuts in (False, True):
+        game = Game.Game(size, ai=HamiltonianCycle(size, shortcuts=shortcuts), seed=seed)
+        ticks = 0
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            game.restart()
+            while not game.isEndGame():
+                game.move()
+                ticks += 1
+        elapsed = time.perf_counter() - start
+        label = 'shortcuts' if shortcuts else 'cycle only'
+        print(f'    {size}x{size} {label:<12} {ticks:>7} ticks  win {game.isWin()}'
+              f'  {elapsed / ticks * 1e6:>8.1f} us/tick')
+
+
+def many_games(count=100, size=10, max_ticks=2000):
+    import Game
+
+    print('Independent games in one process')
+    games = [Game.Game(size, ai=AStar(size, frontier='bucket'), seed=seed) for seed in range(count)]
+    ticks = 0
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for game in games:
+            game.restart()
+        # Step the games in turns, each game has its own snake so they do not interfere
+        running = games
+        for tick in range(max_ticks):
+            for game in running:
+                game.move()
+                ticks += 1
+            running = [game for game in running if not game.isEndGame()]
+            if not running:
+                break
+    elapsed = time.perf_counter() - start
+    scores = [game.getScore() for game in games]
+
+    # The same game played alone gives the same score
+    alone = Game.Game(size, ai=AStar(size, frontier='bucket'), seed=0)
+    with contextlib.redirect_stdout(io.StringIO()):
+        alone.restart()
+        for tick in range(max_ticks):
+            if alone.isEndGame():
+                break
+            alone.move()
+    print(f'    {count} games {size}x{size}  {count / elapsed:>8.1f} games/s  {ticks / elapsed:>9.0f} ticks/s'
+          f'  mean score {sum(scores) / count:.0f}  same as alone {alone.getScore() == scores[0]}')
+
+
+# An agent that never turns, so the snake runs into the wall and the episodes are short
+class Straight:
+    def find_path(self, beginning_pos, goal_pos, direction, snake_whole_body, snake_length):
+        return []
+
+
+def episodes(duration=1.0):
+    import Game
+
+    print('Short episodes per second, allocating on every reset and with the lazy reset')
+    for size in (10, 30, 60, 120):
+        for hard in (True, False):
+            game = Game.Game(size, ai=Straight(), seed=0)
+            count = 0
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                while time.perf_counter() - start < duration:
+                    game.restart(hard)
+                    while not game.isEndGame():
+                        game.move()
+                    count += 1
+            elapsed = time.perf_counter() - start
+            label = 'hard reset' if hard else 'lazy reset'
+            print(f'    {size}x{size}  {label:<12} {count / elapsed:>10.0f} episodes/s')
+
+
+# The food spawning as it was, drawing cells until one is not on the snake
+def rejection_food(rng, size, body):
+    while True:
+        pos = rng.randrange(0, size), rng.randrange(0, size)
+        if pos not in body:
+            return pos
+
+
+def food(size=20, draws=200, seed=0):
+    import random
+    import Game
+
+    print('Food spawning against the fill level of the board')
+    rng = random.Random(seed)
+    game = Game.Game(size, ai=HamiltonianCycle(size), seed=seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        game.restart()
+    for ratio in (0.1, 0.5, 0.9, 0.99):
+        # Play on until the snake fills the ratio of the board
+        with contextlib.redirect_stdout(io.StringIO()):
+            while game.snake.get_snake_length() < size * size * ratio:
+                game.move()
+        snake = game.snake
+        body = snake.getWholeSnake()
+
+        start = time.perf_counter()
+        for i in range(draws):
+            rejection_food(rng, size, body)
+        per_rejection = (time.perf_counter() - start) / draws
+
+        start = time.perf_counter()
+        for i in range(draws):
+            snake.getFreeCell(rng.randrange(snake.getFreeCount()))
+        per_free = (time.perf_counter() - start) / draws
+
+        print(f'    {size}x{size} {ratio:>4.0%} full  rejection {per_rejection * 1e6:>9.1f} us'
+              f'  free cells {per_free * 1e6:>6.2f} us')
+
+
+# The collision check as it was, building the body list for every query
+def list_collide(game, pos):
+    return pos == game.getSnakeHead() or pos in game.getSnakeBody()
+
+
+def collision(size=20, seed=0):
+    import Game
+
+    print('Game.isCollide against the length of the snake')
+    game = Game.Game(size, ai=HamiltonianCycle(size), seed=seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        game.restart()
+    probes = [(x, y) for y in range(size) for x in range(size)]
+    for ratio in (0.1, 0.5, 0.9):
+        with contextlib.redirect_stdout(io.StringIO()):
+            while game.snake.get_snake_length() < size * size * ratio:
+                game.move()
+
+        start = time.perf_counter()
+        for pos in probes:
+            list_collide(game, pos)
+        per_list = (time.perf_counter() - start) / len(probes)
+
+        start = time.perf_counter()
+        for pos in probes:
+            game.isCollide(pos, True)
+        per_grid = (time.perf_counter() - start) / len(probes)
+
+        print(f'    {size}x{size} length {game.snake.get_snake_length():>4}  body list {per_list * 1e6:>7.2f} us'
+              f'  occupancy {per_grid * 1e6:>5.2f} us')
+
+
+# An incremental agent that moves towards the food without colliding right away, as BatchGame.greedy does
+class Greedy:
+    incremental = True
+
+    def __init__(self, size):
+        self.size = size
+        self.neighbours = Grid.neighbour_table(size)
+
+    def find_path(self, beginning_pos, goal_pos, direction, snake_whole_body, snake_length):
+        size = self.size
+        head = Grid.encode(beginning_pos, size)
+        tail = Grid.encode(snake_whole_body[0], size)
+        body = {Grid.encode(pos, size) for pos in snake_whole_body}
+        reverse = Grid.OPPOSITE[Grid.MOVE_OF[direction]]
+        food_x, food_y = goal_pos
+        best = None
+        for move, n in self.neighbours[head]:
+            if move == reverse or (n in body and n != tail):
+                continue
+            x, y = Grid.decode(n, size)
+            distance = abs(x - food_x) + abs(y - food_y)
+            if best is None or distance < best[0]:
+                best = (distance, move)
+        return [Grid.MOVES[best[1]]] if best is not None else []
+
+
+def batch(size=10, steps=200, duration=2.0):
+    import Game
+    from BatchGame import BatchGame
+
+    print('Steps per second of single games and of games stepped in lockstep')
+    game = Game.Game(size, ai=Greedy(size), seed=0)
+    count = 0
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        game.restart()
+        while time.perf_counter() - start < duration:
+            game.move()
+            count += 1
+            if game.isEndGame():
+                game.restart()
+    single = count / (time.perf_counter() - start)
+    print(f'    {size}x{size} Game                {single:>12.0f} steps/s')
+
+    for games in (1, 64, 1024, 4096):
+        env = BatchGame(size, games, seed=0)
+        episodes = 0
+        start = time.perf_counter()
+        for i in range(steps):
+            ate, done, win, score = env.step(env.greedy())
+            episodes += int(done.sum())
+        elapsed = time.perf_counter() - start
+        print(f'    {size}x{size} BatchGame {games:>5} games {games * steps / elapsed:>12.0f} steps/s'
+              f'  {games * steps / elapsed / single:>7.1f}x  {episodes / elapsed:>9.0f} episodes/s')
+
+
+def snapshot(size=20, depth=10, repeat=200, seed=0):
+    import copy
+    import Game
+
+    print('Look-ahead of a few moves: deep copy of the snake against snapshot and restore')
+    game = Game.Game(size, ai=HamiltonianCycle(size), seed=seed)
+    agent = HamiltonianCycle(size)
+    with contextlib.redirect_stdout(io.StringIO()):
+        game.restart()
+    for ratio in (0.1, 0.5, 0.9):
+        with contextlib.redirect_stdout(io.StringIO()):
+            while game.snake.get_snake_length() < size * size * ratio:
+                game.move()
+        food = game.getFoodPos()
+
+        # Follow the cycle for depth moves, then throw the moves away
+        def look_ahead(snake):
+            for i in range(depth):
+                path = agent.find_path(snake.getHead(), food, snake.getDirection(), snake.getWholeSnakeView(),
+                                       snake.get_snake_length())
+                snake.changeDirection(path[0])
+                snake.move(food)
+
+        start = time.perf_counter()
+        for i in range(repeat):
+            look_ahead(copy.deepcopy(game.snake))
+        per_copy = (time.perf_counter() - start) / repeat
+
+        start = time.perf_counter()
+        for i in range(repeat):
+            mark = game.snake.snapshot()
+            look_ahead(game.snake)
+            game.snake.restore(mark)
+        game.snake.commit()
+        per_snapshot = (time.perf_counter() - start) / repeat
+
+        print(f'    {size}x{size} length {game.snake.get_snake_length():>4} {depth} moves'
+              f'  deep copy {per_copy * 1e6:>8.1f} us  snapshot {per_snapshot * 1e6:>7.1f} us')
+
+
+def monte_carlo(size=10, games=3, max_ticks=300):
+    import Game
+
+    print('Monte Carlo agent, rollouts on snapshot and restore and in lockstep on a BatchGame')
+    for engine in ('snapshot', 'batch'):
+        for rollouts in (64, 256):
+            lengths = []
+            ticks = 0
+            rollouts_per_second = []
+            start = time.perf_counter()
+            for seed in range(games):
+                ai = MonteCarlo(size, rollouts=rollouts, seed=seed, engine=engine)
+                game = Game.Game(size, ai=ai, seed=seed)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    game.restart()
+                    for tick in range(max_ticks):
+                        if game.isEndGame():
+                            break
+                        game.move()
+                        ticks += 1
+                lengths.append(game.snake.get_snake_length())
+                rollouts_per_second.append(ai.rollouts_per_second())
+            elapsed = time.perf_counter() - start
+            print(f'    {size}x{size} {engine:<9} {rollouts:>4} rollouts/tick'
+                  f'  {sum(rollouts_per_second) / games:>8.0f} rollouts/s  {elapsed / ticks * 1000:>7.2f} ms/tick'
+                  f'  lengths {lengths}')
+
+
+def strips(repeat=5):
+    print('STRIPS planner against A* (without the safety check) on the same boards')
+    for name, size, body, direction, food in boards():
+        for label, ai in (('strips', STRIPS(size)), ('astar', AStar(size, safety_check=False))):
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                for i in range(repeat):
+                    path = ai.find_path(body[-1], food, direction, body, len(body))
+            elapsed = time.perf_counter() - start
+            print(f'    {name:<20} {label:<8} {elapsed / repeat * 1000:>9.2f} ms/plan'
+                  f'  {ai.expansions:>7} expansions  length {len(path)}')
+
+
+# Every registered agent plays the same seeded games, created by name through Game
+def agents(size=10, games=3, max_ticks=1000):
+    import Game
+
+    print('Registered agents on the same seeded games')
+    options = {'monte_carlo': {'rollouts': 16}}
+    for name in Agent.names():
+        game = Game.Game(size, ai=name, seed=0, ai_options=options.get(name))
+        lengths = []
+        ticks = 0
+        start = time.perf_counter()
+        for i in range(games):
+            with contextlib.redirect_stdout(io.StringIO()):
+                game.restart()
+                for tick in range(max_ticks):
+                    if game.isEndGame():
+                        break
+                    game.move()
+                    ticks += 1
+            lengths.append(game.snake.get_snake_length())
+        elapsed = time.perf_counter() - start
+        game.close()
+        print(f'    {name:<14} {elapsed / ticks * 1000:>7.3f} ms/tick  lengths {lengths}  {game.getAgentStats()}')
+
+
+# The game loop is paced as the UI paces it (one tick every period seconds), the background worker plans while
+# the loop sleeps, the synchronous agent plans inside the tick that eats the food
+def background(sizes=(20, 40), period=0.01, max_ticks=300, seed=0):
+    import Game
+
+    print(f'Tick latency of Game.move in milliseconds, one tick every {period * 1000:.0f} ms')
+    for size in sizes:
+        for label in ('AStar', 'background'):
+            ai = AStar(size) if label == 'AStar' else BackgroundPlanner(size)
+            game = Game.Game(size, ai=ai, seed=seed)
+            latencies = []
+            with contextlib.redirect_stdout(io.StringIO()):
+                game.restart()
+                for tick in range(max_ticks):
+                    if game.isEndGame():
+                        break
+                    start = time.perf_counter()
+                    game.move()
+                    elapsed = time.perf_counter() - start
+                    latencies.append(elapsed * 1000)
+                    time.sleep(max(0.0, period - elapsed))
+                game.close()
+            stats = game.getAgentStats() if label == 'background' else {}
+            print(f'    {size}x{size} {label:<11} {len(latencies):>4} ticks  length {game.snake.get_snake_length():>3}'
+                  f'  p50 {percentile(latencies, 50):>7.3f}  p99 {percentile(latencies, 99):>7.3f}'
+                  f'  max {max(latencies):>7.3f}  {stats}')
+
+
+benchmarks = {
+    'astar_kernels': astar_kernels,
+    'astar_frontiers': astar_frontiers,
+    'astar_heuristics': astar_heuristics,
+    'replanning': replanning,
+    'latency': latency,
+    'safety': safety,
+    'bitboard': bitboard,
+    'hamiltonian': hamiltonian,
+    'many_games': many_games,
+    'episodes': episodes,
+    'food': food,
+    'collision': collision,
+    'batch': batch,
+    'snapshot': snapshot,
+    'monte_carlo': monte_carlo,
+    'strips': strips,
+    'agents': agents,
+    'background': background,
+}
+
+
+if __name__ == '__main__':
+    for n in sys.argv[1:] or benchmarks.keys():
+        benchmarks[n]()
@@ -0,0 +1,88 @@
+"""
+Occupancy of the whole board stored in a single Python int
+    -   Bit (y * size + x) is set iff the cell (x, y) is occupied, the same encoding as AI_Agents.Grid
+    -   Shifting by 1 moves every cell one column, shifting by size moves every cell one row
+    -   The column masks stop a shift from wrapping a cell onto the next or previous row
+    -   The operations work on every cell at once, a big int is processed a machine word at a time
+
+Functions:
+    -   bit(pos, size) / bit_of(cell)
+    -   from_cells(cells) / from_positions(positions, size)
+    -   neighbours(bits, size)    --> every cell next to a cell of bits
+    -   flood_fill(seed, free, size)
+    -   count(bits)
+    -   cells(bits)    --> the cells of the set bits, lowest first
+"""
+import functools
+
+
+# This function returns the masks of a board size: (whole board, every column but the first, every column but the last)
+@functools.lru_cache(maxsize=None)
+def masks(size):
+    row_without_first = ((1 << size) - 1) & ~1
+    row_without_last = (1 << (size - 1)) - 1
+    without_first = 0
+    without_last = 0
+    for y in range(size):
+        without_first |= row_without_first << (y * size)
+        without_last |= row_without_last << (y * size)
+    return (1 << (size * size)) - 1, without_first, without_last
+
+
+def bit_of(cell):
+    return 1 << cell
+
+
+# Out of bound positions have no bit
+def bit(pos, size):
+    x = int(pos[0])
+    y = int(pos[1])
+    if x < 0 or x >= size or y < 0 or y >= size:
+        return 0
+    return 1 << (y * size + x)
+
+
+def from_cells(cells):
+    bits = 0
+    for cell in cells:
+        bits |= 1 << cell
+    return bits
+
+
+def from_positions(positions, size):
+    bits = 0
+    for pos in positions:
+        bits |= bit(pos, size)
+    return bits
+
+
+def is_set(bits, cell):
+    return (bits >> cell) & 1 == 1
+
+
+# This function returns the cells next to any cell of bits, the cells of bits themselves are not included
+# unless they are next to another cell of bits
+def neighbours(bits, size):
+    full, without_first, without_last = masks(size)
+    return (((bits << 1) & without_first) | ((bits >> 1) & without_last) | (bits << size) | (bits >> size)) & full
+
+
+# This function returns every cell reachable from seed by moving through free cells (seed included)
+def flood_fill(seed, free, size):
+    reached = seed
+    frontier = seed
+    while frontier:
+        frontier = neighbours(frontier, size) & free & ~reached
+        reached |= frontier
+    return reached
+
+
+def count(bits):
+    return bits.bit_count()
+
+
+def cells(bits):
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
@@ -0,0 +1,276 @@
+"""
+Randomized consistency checks of the game state against simple reference implementations
+Usage:
+    python Check.py [name ...]
+
+Every check is seeded, so a failure can be replayed, and raises an AssertionError on the first mismatch
+    -   snake:      the occupancy, segment indices and free cells of Snake against its body list (every move)
+    -   snapshot:   Snake.restore against the state recorded at every mark (nested marks, growth, collisions)
+    -   collision:  Game.isCollide against the list based check (grid and bitboard occupancy)
+    -   batch:      every game of a BatchGame against a Snake stepped with the same moves and food (needs NumPy)
+    -   distance_field: the repaired field of DistanceField against a field computed from scratch (random walls)
+    -   dstar:      D* Lite never turns back on single-cell boards, and its move kept across ticks against a fresh one
+"""
+import contextlib
+import io
+import random
+import sys
+
+import Game
+import Snake
+from AI_Agents import Grid
+from AI_Agents.DStarLite import DStarLite
+
+
+def is_on_board(pos, size):
+    return 0 <= pos[0] < size and 0 <= pos[1] < size
+
+
+# A random food on a free cell with probability p, off the board otherwise
+def random_food(rng, snake, p=0.3):
+    if rng.random() < p and snake.getFreeCount():
+        return snake.getFreeCell(rng.randrange(snake.getFreeCount()))
+    return (-5, -5)
+
+
+# This function returns everything restore has to bring back
+def snake_state(snake):
+    n = snake.boardSize
+    positions = [(c % n, c // n) for c in range(n * n)]
+    return (snake.getWholeSnake(), snake.getHead(), snake.getDirection(), snake.get_snake_length(),
+            snake.isBitten(), snake.getOccupancy(),
+            [snake.isOccupied(pos) for pos in positions], [snake.getSegmentIdx(pos) for pos in positions],
+            snake.getFreeCount(), sorted(snake.getFreeCell(i) for i in range(snake.getFreeCount())))
+
+
+# The occupancy, the free cells and the bitboard all describe the same body
+def check_snake_invariants(snake):
+    n = snake.boardSize
+    body = snake.getWholeSnake()
+    cells = {pos for pos in body}
+    assert len(body) == snake.get_snake_length()
+    assert body[-1] == snake.getHead()
+    for c in range(n * n):
+        pos = (c % n, c // n)
+        assert snake.isOccupied(pos) == (pos in cells), pos
+    free = [snake.getFreeCell(i) for i in range(snake.getFreeCount())]
+    assert len(set(free)) == len(free)
+    assert set(free) == {(c % n, c // n) for c in range(n * n)} - cells
+    if snake.getOccupancy() is not None:
+        assert snake.getOccupancy() == sum(1 << (y * n + x) for x, y in cells)
+
+
+def snake(seed=0):
+    rng = random.Random(seed)
+    moves = 0
+    for size in (2, 3, 5, 8):
+        for bitboard in (False, True):
+            s = Snake.Snake(size, bitboard=bitboard)
+            for trial in range(100):
+                s.reset(hard=rng.random() < 0.1)
+                check_snake_invariants(s)
+                for i in range(4 * size * size):
+                    s.changeDirection(rng.choice(Grid.MOVES))
+                    s.move(random_food(rng, s))
+                    moves += 1
+                    if not is_on_board(s.getHead(), size) or s.isBitten() or s.isWin():
+                        break
+                    check_snake_invariants(s)
+    print(f'snake: {moves} moves checked')
+
+
+def snapshot(seed=0):
+    rng = random.Random(seed)
+    restores = 0
+    for size in (2, 3, 5, 8):
+        for bitboard in (False, True):
+            s = Snake.Snake(size, bitboard=bitboard)
+            for trial in range(300):
+                s.reset()
+
+                # Play a few moves for real first
+                alive = True
+                for i in range(rng.randrange(0, 3 * size)):
+                    s.changeDirection(rng.choice(Grid.MOVES))
+                    s.move(random_food(rng, s))
+                    if not is_on_board(s.getHead(), size) or s.isBitten() or s.isWin():
+                        alive = False
+                        break
+                if not alive:
+                    continue
+
+                # Then moves that are undone, with marks taken along the way (a collision is undone as well)
+                before = snake_state(s)
+                mark = s.snapshot()
+                marks = []
+                for k in range(rng.randrange(1, 4 * size)):
+                    if rng.random() < 0.2:
+                        marks.append((s.snapshot(), snake_state(s)))
+                    s.changeDirection(rng.choice(Grid.MOVES))
+                    s.move(random_food(rng, s))
+                    if not is_on_board(s.getHead(), size) or s.isWin():
+                        break
+                for inner, state in reversed(marks):
+                    s.restore(inner)
+                    assert snake_state(s) == state, (size, bitboard, trial)
+                    restores += 1
+                s.restore(mark)
+                assert snake_state(s) == before, (size, bitboard, trial)
+                restores += 1
+                s.commit()
+                check_snake_invariants(s)
+    print(f'snapshot: {restores} restores checked')
+
+
+def list_collide(game, pos):
+    size = game.size
+    return not is_on_board(pos, size) or pos == game.getSnakeHead() or pos in game.getSnakeBody()
+
+
+def collision(seed=0):
+    rng = random.Random(seed)
+    checks = 0
+    for size in (3, 6, 10):
+        for bitboard in (False, True):
+            game = Game.Game(size, ai='hamiltonian' if size % 2 == 0 else 'astar', bitboard=bitboard, seed=seed)
+            with contextlib.redirect_stdout(io.StringIO()):
+                for episode in range(10):
+                    game.restart()
+                    for tick in range(200):
+                        if game.isEndGame():
+                            break
+                        for y in range(-1, size + 1):
+                            for x in range(-1, size + 1):
+                                assert game.isCollide((x, y), True) == list_collide(game, (x, y)), (size, x, y)
+                                checks += 1
+                        # A random move now and then, so the games also end by running into the body
+                        if rng.random() < 0.1:
+                            game.keyHandler([rng.choice(Grid.MOVES)])
+                        game.move()
+            game.close()
+    print(f'collision: {checks} cells checked')
+
+
+def batch(seed=0, games=64, steps=3000):
+    import numpy as np
+
+    from BatchGame import BatchGame
+
+    episodes = 0
+    for size in (3, 6):
+        env = BatchGame(size, games, seed=seed)
+        snakes = [Snake.Snake(size) for i in range(games)]
+        scores = [0] * games
+        rng = np.random.default_rng(seed)
+        for t in range(steps):
+            moves = env.greedy() if t % 3 else rng.integers(0, len(Grid.MOVES), games)
+            foods = [env.getFoodPos(g) for g in range(games)]
+            ate, done, win, score = env.step(moves)
+            for g in range(games):
+                s = snakes[g]
+                s.changeDirection(Grid.MOVES[moves[g]])
+                eaten = s.move(foods[g])
+                dead = not is_on_board(s.getHead(), size) or s.isBitten()
+                won = not dead and s.isWin()
+
+                # The score of Game: + scoreIncrement for a food (or the win), - scoreDecrement otherwise
+                expected = scores[g]
+                if (eaten or won) and not dead:
+                    expected += Game.Game.scoreIncrement
+                else:
+                    expected = max(expected - Game.Game.scoreDecrement, 0)
+
+                assert done[g] == (dead or won), (size, t, g)
+                assert win[g] == won, (size, t, g)
+                assert score[g] == expected, (size, t, g)
+                if done[g]:
+                    episodes += 1
+                    s.reset()
+                    scores[g] = 0
+                else:
+                    scores[g] = expected
+                    assert env.getWholeSnake(g) == s.getWholeSnake(), (size, t, g)
+
+                # The stamps of the game are its body, the food is on a free cell
+                occupied = set(np.flatnonzero(env.stamp[g] == env.epoch[g]).tolist())
+                assert occupied == {y * size + x for x, y in env.getWholeSnake(g)}, (size, t, g)
+                assert int(env.food[g]) not in occupied, (size, t, g)
+    print(f'batch: {episodes} episodes checked')
+
+
+def distance_field(seed=0):
+    from AI_Agents.DistanceField import DistanceField
+
+    rng = random.Random(seed)
+    fields = 0
+    for trial in range(500):
+        size = rng.randrange(3, 10)
+        cells = size * size
+        field = DistanceField(size)
+        goal = rng.randrange(cells)
+        walls = bytearray(1 if rng.random() < 0.3 and c != goal else 0 for c in range(cells))
+        fallback = [cells * cells] * cells
+        for step in range(20):
+            expected = DistanceField(size).heuristic(goal, walls, fallback)
+            assert field.heuristic(goal, walls, fallback) == expected, (trial, step)
+            fields += 1
+
+            # A few walls are added or removed between two calls, as the body moves
+            walls = bytearray(walls)
+            for k in range(rng.randrange(1, 4)):
+                cell = rng.randrange(cells)
+                if cell != goal:
+                    walls[cell] ^= 1
+    print(f'distance_field: {fields} fields checked')
+
+
+def dstar(seed=0):
+    rng = random.Random(seed)
+
+    # A snake of length 1 has no neck, the first move is never the reverse of its direction
+    for trial in range(400):
+        size = rng.randrange(3, 12)
+        head = (rng.randrange(size), rng.randrange(size))
+        food = rng.choice([(x, y) for x in range(size) for y in range(size) if (x, y) != head])
+        direction = rng.choice(Grid.MOVES)
+        path = DStarLite(size).find_path(head, food, direction, [head], 1)
+        assert not path or Grid.MOVE_OF[path[0]] != Grid.OPPOSITE[Grid.MOVE_OF[direction]], (trial, size, head, food)
+
+    # The walls and the search tree kept between ticks give the move of a search from scratch
+    moves = 0
+    for size in (4, 7, 12):
+        kept = DStarLite(size)
+        s = Snake.Snake(size)
+        for game in range(20):
+            s.reset()
+            kept.reset()
+            food = random_food(rng, s, 1)
+            for tick in range(500):
+                body = s.getWholeSnake()
+                path = kept.find_path(s.getHead(), food, s.getDirection(), s.getWholeSnakeView(), len(body))
+                assert path == DStarLite(size).find_path(s.getHead(), food, s.getDirection(), body, len(body)), \
+                    (size, game, tick)
+                moves += 1
+
+                # Off the plan now and then, so the body also changes in ways the repair has to catch
+                s.changeDirection(path[0] if path and rng.random() < 0.85 else rng.choice(Grid.MOVES))
+                ate = s.move(food)
+                if not is_on_board(s.getHead(), size) or s.isBitten() or s.isWin():
+                    break
+                if ate:
+                    food = random_food(rng, s, 1)
+    print(f'dstar: 400 single-cell boards and {moves} moves checked')
+
+
+checks = {
+    'snake': snake,
+    'snapshot': snapshot,
+    'collision': collision,
+    'batch': batch,
+    'distance_field': distance_field,
+    'dstar': dstar,
+}
+
+if __name__ == '__main__':
+    for name in sys.argv[1:] or checks.keys():
+        checks[name]()
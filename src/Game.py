@@ -1,16 +1,17 @@
 import Snake
-import pygame
+import Bitboard
 import random
 import queue
 
 from Direction import Direction
-from AI_Agents.AStar import AStar
+from AI_Agents import Agent
 
 
 class Game:
     """
     This class handles all the game logics
     This class will be called in UI class
+    This class does not depend on pygame, the UI maps the keys into Direction before passing them in
     This class provides methods to:
         generate food
         handle user input
@@ -27,32 +28,47 @@ class Game:
     scoreDecrement = 1
     food = None
     end_game = False
+    win = False
 
-    def __init__(self, size):
+    # With bitboard = True the snake keeps its occupancy as a bitboard and the collision checks use it
+    # A snake can be passed in (e.g., Snake.SharedSnake), otherwise every game has its own
+    # Every game draws the food from its own random generator, so a seeded game does not depend on the others
+    # ai is an agent, or the name of a registered agent (see Agent.names()) created with ai_options
+    def __init__(self, size, ai=None, bitboard=False, snake=None, seed=None, ai_options=None):
         self.size = size
-        self.snake = Snake.Snake(self.size)
+        self.random = random.Random(seed)
+        self.snake = snake if snake is not None else Snake.Snake(self.size, bitboard=bitboard)
 
         # Instantiate AI Agent and a list of solution path
-        self.__ai = AStar()
+        # When the agent is asked depends on its incremental flag (see Agent.incremental)
+        if ai is None:
+            ai = 'astar'
+        if isinstance(ai, str):
+            ai = Agent.create(ai, self.size, **(ai_options or {}))
+        self.__ai = Agent.as_agent(ai)
         self.path = []
 
         self.event_queue = queue.Queue()
 
     def start(self):
         self.__generateFood()
-        self.__call_AI(self.__ai, True)
+        self.__foodSpawned()
 
     # Reset all the variables and restart the game
-    def restart(self):
-        self.snake.reset()
+    # The snake is reset lazily unless hard = True, the directions left from the last game are dropped
+    def restart(self, hard=False):
+        self.snake.reset(hard)
+        self.__ai.reset()
+        self.event_queue.queue.clear()
         self.foodPos = None
         self.food = None
         self.score = 0
         self.end_game = False
+        self.win = False
         self.start()
 
     # This function runs the logics
-    # This function takes a queue of event as input
+    # This function takes a queue (or a list) of Direction as input
     # Return specific int values to represent different scenarios:
     #       0 = Normal
     #       1 = Quit
@@ -61,11 +77,15 @@ class Game:
     def keyHandler(self, event):
         if not self.__isFoodExist():
             self.__generateFood()
-            self.__call_AI(self.__ai, True)
+            self.__foodSpawned()
 
         # Change Direction
-        for e in event:
-            self.event_queue.put(e)
+        if isinstance(event, queue.Queue):
+            while not event.empty():
+                self.event_queue.put(event.get_nowait())
+        else:
+            for e in event:
+                self.event_queue.put(e)
 
     # This function changes the direction that the snake goes,
     # calls this function before moving the snake
@@ -75,28 +95,28 @@ class Game:
             return
 
         direction = None
-        event = self.event_queue.get()
-        cont = True
-
-        # Continue iterating the queue until a valid event is met
-        while cont:
-            if event == pygame.K_w or event == Direction.UP:
-                direction = Direction.UP
-                cont = False
-            elif event == pygame.K_s or event == Direction.DOWN:
-                direction = Direction.DOWN
-                cont = False
-            elif event == pygame.K_a or event == Direction.LEFT:
-                direction = Direction.LEFT
-                cont = False
-            elif event == pygame.K_d or event == Direction.RIGHT:
-                direction = Direction.RIGHT
-                cont = False
+
+        # Continue iterating the queue until a valid event is met, anything but a Direction is skipped
+        while direction is None and not self.event_queue.empty():
+            event = self.event_queue.get()
+            if isinstance(event, Direction):
+                direction = event
+
+        if direction is None:
+            return
 
         self.snake.changeDirection(direction)
-        print("Changed Direction " + str(direction))
 
     def move(self):
+        # An incremental agent repairs its plan on every tick instead of replaying the queued directions
+        # It is only asked here, not when the food appears, so it is asked once per tick
+        if self.__isIncremental(self.__ai) and self.__isFoodExist():
+            self.__call_AI(self.__ai, True)
+
+        # A plan that stops short of the food (e.g., it chases the tail) is followed by a new plan once it runs out
+        elif self.event_queue.empty() and self.__isFoodExist():
+            self.__call_AI(self.__ai, True)
+
         # Change the direction of the snake before moving
         self.__changeDir()
 
@@ -108,9 +128,18 @@ class Game:
         if self.isCollide(head, False):
             self.end_game = True
 
+        # The snake fills the whole board, there is no cell left for the food
+        if self.snake.isWin():
+            self.end_game = True
+            self.win = True
+            self.score += self.scoreIncrement
+            if self.score > self.max_score:
+                self.max_score = self.score
+            return
+
         if foodAte:
             self.__generateFood()
-            self.__call_AI(self.__ai, True)
+            self.__foodSpawned()
             self.score += self.scoreIncrement
             if self.score > self.max_score:
                 self.max_score = self.score
@@ -121,36 +150,83 @@ class Game:
     def isEndGame(self):
         return self.end_game
 
+    def isWin(self):
+        return self.win
+
     # This function generate food
+    # The food is drawn from the free cells kept by the snake, so it takes one draw however full the board is
     # Should call AI after a new food is generated
     def __generateFood(self):
         print("Generating food")
-        Collide = True
-        rdm = (None, None)
-        while Collide:
-            rdm = random.randrange(0, self.size), random.randrange(0, self.size)
-            Collide = self.isCollide(rdm, True)
+        count = self.snake.getFreeCount()
+
+        # No cell is left for the food, the snake fills the whole board
+        if count == 0:
+            self.foodPos = None
+            self.end_game = True
+            self.win = True
+            return
+
+        self.foodPos = self.snake.getFreeCell(self.random.randrange(count))
+
+    # This function is called once a new food is generated, with the state after the move of this tick
+    # A plan is asked for right away, an incremental agent is only told (e.g., BackgroundPlanner sends its request)
+    # and is asked for its move at the start of the next tick
+    def __foodSpawned(self):
+        if not self.__isIncremental(self.__ai):
+            self.__call_AI(self.__ai, True)
+        elif self.__isFoodExist():
+            self.__ai.food_spawned(*self.__state())
 
-        self.foodPos = rdm
+    def __state(self):
+        return (self.snake.getHead(), self.foodPos, self.snake.getDirection(),
+                self.snake.getWholeSnakeView(), self.snake.get_snake_length())
 
     # This function receive an AI agent and runs it
     # It adds the solution path to the event queue
     def __call_AI(self, ai, run: bool):
-        if run is True:
-            for node in ai.find_path(self.snake.getHead(), self.foodPos, self.snake.getDirection(),
-                                      self.snake.getWholeSnake_2d(), self.snake.get_snake_length()):
+        if run is True and self.__isFoodExist():
+            state = self.__state()
+
+            # Only the next move of an incremental agent is queued, it is asked again on the next tick
+            if self.__isIncremental(ai):
+                self.event_queue = queue.Queue()
+                move = ai.next_move(*state)
+                if move is not None:
+                    self.event_queue.put(move)
+                return
+
+            for node in ai.plan(*state):
                 self.event_queue.put(node)
 
+    def __isIncremental(self, ai):
+        return ai.incremental
+
+    def getAgent(self):
+        return self.__ai
+
+    # This function releases the agent (e.g., the worker thread of a BackgroundPlanner)
+    # Call it once the game will not be played again, e.g., when running many games in a process
+    def close(self):
+        self.__ai.close()
+
+    def getAgentStats(self):
+        return self.__ai.stats()
+
     # This function checks if a position is collide with the snake
+    # Answered from the occupancy of the snake (its grid, or its bitboard if enabled), the body list is not built
+    # The head shares its cell with the body only if it has run into the body, which the snake flags on the move
     def isCollide(self, pos, checkHead):
-        if checkHead:
-            if pos == self.getSnakeHead():
-                return True
-
-        if self.getSnakeBody().__contains__(pos):
+        if self.__isOutOfBound(pos):
             return True
 
-        return self.__isOutOfBound(pos)
+        if pos == self.getSnakeHead():
+            return checkHead or self.snake.isBitten()
+
+        occupancy = self.snake.getOccupancy()
+        if occupancy is not None:
+            return occupancy & Bitboard.bit(pos, self.size) != 0
+        return self.snake.isOccupied(pos)
 
     def __isOutOfBound(self, pos):
         x = pos[0]
@@ -4,6 +4,9 @@ import queue
 import pygame
 import Block
 import Game
+import Snake
+
+from Direction import Direction
 
 pygame.font.init()
 
@@ -23,6 +26,14 @@ lightGreen = 100, 160, 50
 deepGreen = 70, 125, 35
 red = 175, 80, 80
 
+# The game logic only knows Direction, the keys are mapped here
+keyMap = {
+    pygame.K_w: Direction.UP,
+    pygame.K_s: Direction.DOWN,
+    pygame.K_a: Direction.LEFT,
+    pygame.K_d: Direction.RIGHT,
+}
+
 currDir = os.path.dirname(__file__)
 fontFile = 'arcade.TTF'
 fontPath = os.path.join(currDir, fontFile)
@@ -71,7 +82,7 @@ def draw_food(surface, food_pos):
 
 
 def main(window):
-    gameHandler = Game.Game(numOfGrids)
+    gameHandler = Game.Game(numOfGrids, snake=Snake.SharedSnake(numOfGrids))
     gameHandler.start()
 
     clock = pygame.time.Clock()
@@ -106,8 +117,8 @@ def main(window):
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 run = False
-            elif event.type == pygame.KEYDOWN:
-                keyPressQueue.put_nowait(event.key)
+            elif event.type == pygame.KEYDOWN and event.key in keyMap:
+                keyPressQueue.put_nowait(keyMap[event.key])
 
         # Logic that perform every timePerFrame seconds
         if currentTime >= timePerFrame:
@@ -1,3 +1,8 @@
+import functools
+from array import array
+
+import Bitboard
+
 from Direction import Direction
 
 
@@ -11,12 +16,17 @@ def singleton(class_):
     return getinstance
 
 
-@singleton
+# The (x, y) of every cell of a board, decoding a cell is only indexing and the tuples are shared
+@functools.lru_cache(maxsize=None)
+def position_table(size):
+    return tuple((cell % size, cell // size) for cell in range(size * size))
+
+
 class Snake:
     # Stores position of head and body
     # Snake can move within 30*30 grid
-    # Positional Data will be stored in a list
-    # The list will be a cyclist list, a head pointer will be used to indicate the head position
+    # Positional Data will be stored in a typed array of cells (y * boardSize + x), positions are integers
+    # The array will be a cyclist list, a head pointer will be used to indicate the head position
     # Provide methods to:
     #       change direction
     #       move forward
@@ -25,9 +35,17 @@ class Snake:
     #       get live/dead (call after each move)
     #       eat food (+1 length)
     #       get win (tailIdx == headIdx + 1)
-
-    snake = []      # This will be a cyclic list, so that obtaining body, adding head and removing tail will be O(1)
-    snake_2d = [[]]
+    # Optionally keeps the occupancy of the whole board as a bitboard (see Bitboard), which is updated on each move
+    # Snapshot and restore: the moves after a snapshot are logged, so that k moves are undone in O(k)
+
+    snake = None    # This will be a cyclic array, so that obtaining body, adding head and removing tail will be O(1)
+    grid = None     # Occupancy of the board, indexed by y * boardSize + x, stores the index in snake + 1 (0 = empty)
+    stamp = None    # The epoch each cell of grid was last written in, a cell of an older epoch is empty
+    epoch = 0
+    free = None     # Every cell of the board, the first freeCount are the free cells (in any order)
+    freePos = None  # The index of each cell in free
+    freeCount = 0
+    epochLimit = (1 << (8 * array('I').itemsize)) - 1
     head = ()
     headIdx = 0
     tailIdx = 0
@@ -35,40 +53,70 @@ class Snake:
     snakeMaxSize = 30 * 30
     boardSize = 30
     direction = Direction.LEFT
+    occupancy = None    # Bitboard of the whole snake, None unless the bitboard is enabled
+    overlap = False     # The last head entered a cell that was still occupied
+    journal = None      # Undo log of the moves since the first snapshot, None when no snapshot is taken
 
     # Constructor
-    def __init__(self, boardSize):
+    def __init__(self, boardSize, bitboard=False):
         self.boardSize = boardSize
+        self.bitboard = bitboard
 
         self.snakeMaxSize = boardSize * boardSize
+        # 'H' holds the index + 1 of any board up to 255 * 255
+        self.gridType = 'H' if self.snakeMaxSize < 1 << 16 else 'I'
+        self.positions = position_table(boardSize)
 
         self.reset()
 
-    def reset(self):
-        self.snake = []
-        self.snake_2d = [[]]
-        self.headIdx = 0
+    # A reset only starts a new epoch, the cyclic list and the grid of the last game are reused as they are
+    # With hard = True (or when the epoch counter runs out) everything is allocated again
+    def reset(self, hard=False):
+        # The snake starts in the middle
+        middle = self.boardSize // 2
+        self.load([(middle, middle)], Direction.LEFT, hard)
+
+    # This function places the snake on the given positions (tail first, head last) as a new game would start
+    # Used by reset, and by agents that simulate moves from the state of a game (e.g., MonteCarlo)
+    def load(self, wholeSnake, direction, hard=False):
+        self.overlap = False
+        self.journal = None
+
+        if hard or self.stamp is None or self.epoch == self.epochLimit:
+            # Instantiate zero filled arrays with the size of the board, 2 bytes a cell up to 255 * 255
+            self.snake = array(self.gridType, bytes(array(self.gridType).itemsize * self.snakeMaxSize))
+            self.grid = array(self.gridType, bytes(array(self.gridType).itemsize * self.snakeMaxSize))
+            self.stamp = array('I', bytes(array('I').itemsize * self.snakeMaxSize))
+            self.epoch = 1
+
+            self.free = array(self.gridType, range(self.snakeMaxSize))
+            self.freePos = array(self.gridType, range(self.snakeMaxSize))
+        else:
+            self.epoch += 1
+
+        # free stays a permutation of the cells, any permutation will do, so every cell is free again at once
+        self.freeCount = self.snakeMaxSize
+
+        i = -1
+        for i, pos in enumerate(wholeSnake):
+            cell = self.__cell(pos)
+            self.snake[i] = cell
+            self.grid[cell] = i + 1
+            self.stamp[cell] = self.epoch
+            self.__removeFree(cell)
+        self.length = i + 1
         self.tailIdx = 0
-        self.length = 1
-        middle = self.boardSize / 2
-        self.head = (middle, middle)
-        self.snake.append(self.head)  # Set the snake starts in the middle
-        self.direction = Direction.LEFT
-
-        # Instantiate a list with the size of snakeMaxSize
-        for i in range(1, self.snakeMaxSize):
-            self.snake.append((None, None))
-
-        # Instantiate a 2d list with the size of snakeMaxSize * snakeMaxSize
-        self.snake_2d = [[0] * self.snakeMaxSize for i in range(self.snakeMaxSize)]
+        self.headIdx = i
+        self.head = self.positions[self.snake[i]]
+        self.direction = direction
+        self.occupancy = Bitboard.from_positions(wholeSnake, self.boardSize) if self.bitboard else None
 
     # Plus 1 to the direction
     # A default moving action will add a new head and remove the tail, such that the length of the snake remains
     # If the snake eats a food, the head grow but tail remains, such that the length +1
     # Will check isAlive() at the end and returns the value
     def move(self, foodPos):
-        currentPos = self.snake[self.headIdx]
-        # print("Moving from " + str(currentPos[0]) + ", " + str(currentPos[1]))  # TODO - remove this
+        currentPos = self.head
         x = currentPos[0]
         y = currentPos[1]
         foodX = foodPos[0]
@@ -84,40 +132,67 @@ class Snake:
             x += 1
 
         ate = True
+        head = self.head
+        overlap = self.overlap
+        occupancy = self.occupancy
 
-        # Add head and remove tail if food is not eaten
-        self.__addHead(x, y)
+        # Remove tail if food is not eaten, then add head
+        # The tail is removed first, so that the head can enter the cell the tail just left
         if x != foodX or y != foodY:
             self.__removeTail()
             ate = False
 
-        print(f"Moved from {currentPos[0]}, {currentPos[1]} to {x}, {y}")
+        # Log what adding the head overwrites, the bitboard is an int so the old one is simply kept
+        if self.journal is not None:
+            cell = self.__cell((x, y))
+            added = None
+            if cell is not None:
+                added = (cell, self.snake[(self.headIdx + 1) % self.snakeMaxSize], self.grid[cell], self.stamp[cell])
+            self.journal.append((head, overlap, occupancy, not ate, added))
+
+        self.__addHead(x, y)
+
         return ate
 
     # This function updates the head position and add head into the list
     def __addHead(self, x, y):
-        # Handle cyclic list
         h = (x, y)
         self.head = h
         self.headIdx = (self.headIdx + 1) % self.snakeMaxSize
-        self.snake[self.headIdx] = h
 
-        # Handle 2d list
-        self.snake_2d[int(x)][int(y)] = 1
+        # Handle cyclic list and grid, a head out of the board is not stored (the game is over anyway)
+        cell = self.__cell(h)
+        self.overlap = False
+        if cell is not None:
+            self.snake[self.headIdx] = cell
+            self.overlap = self.__isOccupied(cell)
+            self.grid[cell] = self.headIdx + 1
+            self.stamp[cell] = self.epoch
+            self.__removeFree(cell)
+
+        # Handle bitboard
+        if self.occupancy is not None:
+            self.occupancy |= Bitboard.bit(h, self.boardSize)
 
         # Increase the length
         self.length += 1
 
-    # This function removes the tail and replace it as (None, None) tuple
-    # Then plus one to the tail index
+    # This function removes the tail by plus one to the tail index, the stale cell is left in the array
     def __removeTail(self):
-        x, y = self.snake[self.tailIdx]
+        cell = self.snake[self.tailIdx]
         # Handle cyclic list
-        self.snake[self.tailIdx] = (None, None)
         self.tailIdx = (self.tailIdx + 1) % self.snakeMaxSize
 
-        # Handle 2d list
-        self.snake_2d[int(x)][int(y)] = 0
+        # Handle grid
+        self.grid[cell] = 0
+        self.__addFree(cell)
+
+        # Handle bitboard
+        if self.occupancy is not None:
+            self.occupancy &= ~Bitboard.bit_of(cell)
+
+        # Decrease the length
+        self.length -= 1
 
     # This method changes the direction of the snake as long as the change is valid
     # Snake cannot change direction 180 Degree
@@ -133,8 +208,55 @@ class Snake:
         elif oldDirection is Direction.LEFT and newDirection is Direction.RIGHT:
             return
         else:
+            if self.journal is not None and newDirection is not oldDirection:
+                self.journal.append(oldDirection)
             self.direction = newDirection
 
+    # This function starts logging the moves (if not yet) and returns a mark to restore to
+    # Snapshots can be nested, restoring to a mark undoes the moves after it only
+    def snapshot(self):
+        if self.journal is None:
+            self.journal = []
+        return len(self.journal)
+
+    # This function undoes every move and change of direction after the mark, latest first
+    def restore(self, mark):
+        journal = self.journal
+        while len(journal) > mark:
+            entry = journal.pop()
+            if isinstance(entry, Direction):
+                self.direction = entry
+                continue
+            head, overlap, occupancy, removed, added = entry
+
+            # Undo addHead, a cell that was free before the head entered it (i.e., no overlap) is free again
+            if added is not None:
+                cell, segment, grid, stamp = added
+                if not self.overlap:
+                    self.__addFree(cell)
+                self.snake[self.headIdx] = segment
+                self.grid[cell] = grid
+                self.stamp[cell] = stamp
+            self.headIdx = (self.headIdx - 1) % self.snakeMaxSize
+            self.length -= 1
+
+            # Undo removeTail, the cell of the tail is still in the cyclic array
+            if removed:
+                self.tailIdx = (self.tailIdx - 1) % self.snakeMaxSize
+                cell = self.snake[self.tailIdx]
+                self.grid[cell] = self.tailIdx + 1
+                self.stamp[cell] = self.epoch
+                self.__removeFree(cell)
+                self.length += 1
+
+            self.head = head
+            self.overlap = overlap
+            self.occupancy = occupancy
+
+    # This function stops logging, the moves so far can no longer be undone
+    def commit(self):
+        self.journal = None
+
     # This function returns true iff tailIdx == headIdx + 1 (i.e., filled the whole array)
     def isWin(self):
         i = (self.headIdx + 1) % self.snakeMaxSize
@@ -143,31 +265,119 @@ class Snake:
     def getHead(self):
         return self.head
 
-    # This function returns the body (exclude the head)
+    # This function returns the body (exclude the head) as a list of (x, y), tail first
     def getBody(self):
+        positions = self.positions
+        result = []
+        for view in self.getBodyCells():
+            result.extend(map(positions.__getitem__, view))
+        return result
+
+    # This function returns the cells of the body (exclude the head), tail first
+    # The result is one or two memoryviews into the cyclic array, nothing is copied
+    # The views are only valid until the snake moves again
+    def getBodyCells(self):
         beginning = self.headIdx
         ending = self.tailIdx
+        view = memoryview(self.snake)
 
         # Case 1: beginning < ending
         if beginning < ending:
-            res = self.snake[ending:]
-            res.extend(self.snake[:beginning])
-            return res
+            return view[ending:], view[:beginning]
         # Case 2: beginning > ending
         elif beginning > ending:
-            return self.snake[ending : beginning]
+            return view[ending:beginning],
         # Case 3: beginning == ending
         else:
-            return []
+            return ()
 
     def getWholeSnake(self):
-        result = []
-        result.extend(self.getBody())
+        result = self.getBody()
         result.append(self.getHead())
         return result
 
+    # Returns the whole snake as a SnakeView, which builds no list
+    def getWholeSnakeView(self):
+        return SnakeView(self)
+
+    # Returns a boardSize * boardSize list indexed by [x][y], 1 iff the cell is occupied
     def getWholeSnake_2d(self):
-        return self.snake_2d
+        n = self.boardSize
+        return [[1 if self.__isOccupied(y * n + x) else 0 for y in range(n)] for x in range(n)]
+
+    # Returns the occupancy grid, indexed by y * boardSize + x
+    # An entry is only valid if the stamp of the cell equals the epoch (see getStamp, getEpoch)
+    def getGrid(self):
+        return self.grid
+
+    def getStamp(self):
+        return self.stamp
+
+    def getEpoch(self):
+        return self.epoch
+
+    # Returns the index in the cyclic list of the segment at pos, None if the cell is empty or out of the board
+    def getSegmentIdx(self, pos):
+        cell = self.__cell(pos)
+        if cell is None or not self.__isOccupied(cell):
+            return None
+        return self.grid[cell] - 1
+
+    def getFreeCount(self):
+        return self.freeCount
+
+    # Returns the i-th free cell as (x, y), 0 <= i < getFreeCount()
+    def getFreeCell(self, i):
+        return self.positions[self.free[i]]
+
+    # Swap the cell with the last free cell, then shrink the free part by one
+    def __removeFree(self, cell):
+        i = self.freePos[cell]
+        if i >= self.freeCount:
+            return
+        last = self.freeCount - 1
+        other = self.free[last]
+        self.free[i] = other
+        self.freePos[other] = i
+        self.free[last] = cell
+        self.freePos[cell] = last
+        self.freeCount = last
+
+    # Swap the cell with the first cell after the free part, then grow the free part by one
+    def __addFree(self, cell):
+        i = self.freePos[cell]
+        if i < self.freeCount:
+            return
+        first = self.freeCount
+        other = self.free[first]
+        self.free[i] = other
+        self.freePos[other] = i
+        self.free[first] = cell
+        self.freePos[cell] = first
+        self.freeCount = first + 1
+
+    # Returns true iff the last head entered a cell occupied by the body (i.e., the snake bit itself)
+    def isBitten(self):
+        return self.overlap
+
+    # Returns the cell of the tail (y * boardSize + x)
+    def getTailCell(self):
+        return self.snake[self.tailIdx]
+
+    def isOccupied(self, pos):
+        cell = self.__cell(pos)
+        return cell is not None and self.__isOccupied(cell)
+
+    # Same as isOccupied for an encoded cell on the board
+    def isOccupiedCell(self, cell):
+        return self.stamp[cell] == self.epoch and self.grid[cell] != 0
+
+    def __isOccupied(self, cell):
+        return self.stamp[cell] == self.epoch and self.grid[cell] != 0
+
+    # Returns the bitboard of the whole snake, None if the bitboard is not enabled
+    def getOccupancy(self):
+        return self.occupancy
 
     def get_snake_length(self):
         return self.length
@@ -175,6 +385,14 @@ class Snake:
     def getDirection(self):
         return self.direction
 
+    # Encode a position as an index of the grid, None if it is out of the board
+    def __cell(self, pos):
+        x = int(pos[0])
+        y = int(pos[1])
+        if x < 0 or x >= self.boardSize or y < 0 or y >= self.boardSize:
+            return None
+        return y * self.boardSize + x
+
     def __cyclicIdx(self, i):
         return (i+1) % self.snakeMaxSize
 
@@ -182,11 +400,49 @@ class Snake:
         return "Snake()"
 
     def __str__(self):
-        head = self.snake[self.headIdx]
-        tail = self.snake[self.tailIdx]
-        result = "Snake Length: " + str(len(self.snake)) + " | Head Pos: [" + str(head[0]) + ", " + str(head[1]) + \
+        head = self.head
+        tail = self.getWholeSnake()[0]
+        result = "Snake Length: " + str(self.length) + " | Head Pos: [" + str(head[0]) + ", " + str(head[1]) + \
                  "] | Tail Pos: [" + str(tail[0]) + ", " + str(tail[1]) + "]"
         return result
 
+    # Iterates the whole snake as (x, y), tail first, without building a list
     def __iter__(self):
-        return self.getWholeSnake()
+        for view in self.getBodyCells():
+            yield from map(self.positions.__getitem__, view)
+        yield self.head
+
+
+class SnakeView:
+    # A read only sequence of the whole snake as (x, y), tail first and head last
+    # Reads the cyclic array of the snake directly, so it is only valid until the snake moves again
+    # Indexing is O(1), so an agent that only looks at the tail or the head never pays for the whole body
+
+    def __init__(self, snake):
+        self.snake = snake
+        self.length = snake.get_snake_length()
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self.length))]
+        if i < 0:
+            i += self.length
+        if i < 0 or i >= self.length:
+            raise IndexError('SnakeView index out of range')
+        if i == self.length - 1:
+            return self.snake.head
+        return self.snake.positions[self.snake.snake[(self.snake.tailIdx + i) % self.snake.snakeMaxSize]]
+
+    def __iter__(self):
+        return iter(self.snake)
+
+    # Answered from the occupancy of the snake in O(1), the body list is not built
+    def __contains__(self, pos):
+        return self.snake.isOccupied(pos)
+
+
+# Every Game builds its own Snake, the GUI opts in to one snake shared by the whole process
+SharedSnake = singleton(Snake)